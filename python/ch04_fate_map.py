@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 4 - The Restricted Three-Body Problem : fate maps
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Integrates the equations of ch04_restricted_3_bodies.py for a whole 2-D grid
+of initial conditions and classifies every orbit :
+
+  LIBRATION  : the resonant angle of the orbit librates up to tmax
+  TRANSITION : the resonant angle circulates, the orbit does not librate
+  COLLISION  : the orbit comes within rcoll of one of the primaries (or
+               starts on one of them)
+  ESCAPE     : the orbit goes further than rmax from the barycentre
+  FORBIDDEN  : (x0, y0) lies outside the region allowed by the Jacobi
+               constant, so there is no orbit
+
+The resonant angle is that of the orbit relative to the second primary :
+at every conjunction (the orbit crosses the line from the first primary
+through the second, y = 0 and x < mu) it is the eccentric anomaly of the
+osculating Kepler orbit about the first primary, counted from perihelion
+for an orbit inside that of the second primary and from aphelion for one
+outside. A librating orbit meets the second primary only around that point
+(the 3:2 Hilda orbits of the book at perihelion, the ideal one within 10
+degrees, the more realistic one within 120). A conjunction further than
+phimax (150 degrees) from it, or on an orbit not bound to the first
+primary, means that the angle circulates. Tadpole and horseshoe orbits
+never reach a conjunction and librate too, and so do nearly circular orbits
+well away from the second primary, whose forced eccentricity keeps the
+conjunctions at perihelion (or aphelion).
+
+An orbit stops as soon as it is classified. The grid is either (x0, y0) at
+a fixed Jacobi constant C, with the velocity perpendicular to the radius
+vector, or (x0, v0) with y0 = u0 = 0 as in the Hilda examples of the book.
+Rows of the grid are distributed over a process pool, and the workers
+write their results straight into a shared array.
+
+Example (Sun-Jupiter, x0 from -1 to 1, v0 from -1 to 1, 200 x 200 orbits):
+$ python ch04_fate_map.py 0.000953875 -1 1 -1 1 200 xv fate.npy
+and (x0, y0) from -1.5 to 1.5 at the Jacobi constant 3.0:
+$ python ch04_fate_map.py 0.000953875 -1.5 1.5 -1.5 1.5 200 xy 3.0 fate.npy
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch04_symplectic import coefficients
+from multiprocessing import Pool, RawArray
+import sys
+import numpy as np
+
+FORBIDDEN = 0
+LIBRATION = 1
+TRANSITION = 2
+COLLISION = 3
+ESCAPE = 4
+NAMES = ['forbidden', 'libration', 'transition', 'collision', 'escape']
+
+def initial_xy(x, y, mu, c, sense=1):
+  """Computes the velocities (u,v) for positions (x,y) on the Jacobi
+  constant c, perpendicular to the radius vector and counterclockwise for
+  sense = 1. Returns [u, v, ok], ok is false where 2*Omega < c.
+  """
+  r1 = np.sqrt((x - mu)**2 + y**2)
+  r2 = np.sqrt((x + 1 - mu)**2 + y**2)
+  v2 = x * x + y * y + 2 * (1 - mu) / r1 + 2 * mu / r2 - c
+  ok = v2 >= 0
+  speed = np.sqrt(np.where(ok, v2, 0))
+  r = np.hypot(x, y)
+  r = np.where(r > 0, r, 1)
+  return [-sense * speed * y / r, sense * speed * x / r, ok]
+
+def classify(x, y, u, v, mu, dt, tmax, order=4, rcoll=(.005, .001), rmax=3.0, phimax=5 * np.pi / 6):
+  """Integrates arrays of orbits with the symplectic method of
+  ch04_symplectic.py and returns [code, tend] : the class of each orbit
+  and the time at which it was classified (tmax for librating orbits)
+  """
+  x, y, u, v = [np.array(q, dtype=float).ravel() for q in np.broadcast_arrays(x, y, u, v)]
+  norb = x.size
+  code = np.full(norb, LIBRATION, dtype=np.int8)
+  tend = np.full(norb, float(tmax))
+  [c, d] = coefficients(order)
+  drifts = [(ci * dt, np.cos(ci * dt), np.sin(ci * dt)) for ci in c]
+  kicks = [di * dt for di in d]
+  mu1 = 1 - mu
+  rc1 = rcoll[0] ** 2
+  rc2 = rcoll[1] ** 2
+  rm = rmax ** 2
+
+  idx = np.arange(norb)
+  px = u - y
+  py = v + x
+
+  # an orbit that starts on one of the primaries
+  a = x - mu
+  b = x + mu1
+  yy = y * y
+  start = ~((a * a + yy >= rc1) & (b * b + yy >= rc2))
+  if start.any():
+    code[start] = COLLISION
+    tend[start] = 0.0
+    keep = ~start
+    idx = idx[keep]
+    x, y, px, py = x[keep], y[keep], px[keep], py[keep]
+
+  pending = 0.0
+  nstep = int(round(tmax / dt))
+  for i in range(1, nstep + 1):
+    if idx.size == 0:
+      break
+    ystart = y
+    for j in range(len(drifts)):
+      k = kicks[j] + pending
+      pending = 0.0
+      a = x - mu
+      b = x + mu1
+      yy = y * y
+      r1 = a * a + yy
+      r2 = b * b + yy
+      g1 = mu1 / (r1 * np.sqrt(r1))
+      g2 = mu / (r2 * np.sqrt(r2))
+      px = px - k * (g1 * a + g2 * b)
+      py = py - k * (g1 + g2) * y
+      h, cs, sn = drifts[j]
+      qx = x + h * px
+      qy = y + h * py
+      x = cs * qx + sn * qy
+      y = cs * qy - sn * qx
+      qx = px
+      px = cs * qx + sn * py
+      py = cs * py - sn * qx
+    pending = kicks[-1]
+
+    # classify with the positions at the end of the step
+    a = x - mu
+    b = x + mu1
+    yy = y * y
+    r1 = a * a + yy
+    hitc = ~((r1 >= rc1) & (b * b + yy >= rc2))
+    hite = x * x + yy > rm
+    # resonant angle at a conjunction : eccentric anomaly of the osculating
+    # orbit about the first primary (velocity px, py - mu relative to it)
+    conj = (ystart * y < 0) & (x < mu)
+    r1 = np.sqrt(r1)
+    qy = py - mu
+    inva = 2 / r1 - (px * px + qy * qy) / mu1
+    with np.errstate(invalid='ignore'):
+      ea = np.abs(np.arctan2((a * px + y * qy) * np.sqrt(inva / mu1), 1 - r1 * inva))
+    phi = np.where(inva > 1, ea, np.pi - ea)
+    hitt = conj & ((inva <= 0) | (phi > phimax))
+    done = hitc | hite | hitt
+    if done.any():
+      # order of precedence : collision, escape, transition
+      code[idx[hitt]] = TRANSITION
+      code[idx[hite]] = ESCAPE
+      code[idx[hitc]] = COLLISION
+      tend[idx[done]] = i * dt
+      keep = ~done
+      idx = idx[keep]
+      x, y, px, py = x[keep], y[keep], px[keep], py[keep]
+  return [code, tend]
+
+# shared result arrays of the worker processes
+shared = {}
+
+def init_worker(codes, times, shape):
+  """Stores the shared result arrays in the worker process
+  """
+  shared['code'] = np.frombuffer(codes, dtype=np.int8).reshape(shape)
+  shared['tend'] = np.frombuffer(times, dtype=np.float64).reshape(shape)
+
+def scan_rows(args):
+  """Computes the rows j0 to j1 of a fate map and writes them into the
+  shared result arrays
+  """
+  (j0, j1, mode, xs, bs, mu, c, sense, dt, tmax, order, rcoll, rmax, phimax) = args
+  xg, bg = np.meshgrid(xs, bs[j0:j1])
+  if mode == 'xy':
+    [u, v, ok] = initial_xy(xg, bg, mu, c, sense)
+    y = bg
+  else:
+    u = np.zeros_like(xg)
+    v = bg
+    y = np.zeros_like(xg)
+    ok = np.ones(xg.shape, dtype=bool)
+  code = np.full(xg.shape, FORBIDDEN, dtype=np.int8)
+  tend = np.zeros(xg.shape)
+  if ok.any():
+    code[ok], tend[ok] = classify(xg[ok], y[ok], u[ok], v[ok], mu, dt, tmax, order, rcoll, rmax, phimax)
+  shared['code'][j0:j1] = code
+  shared['tend'][j0:j1] = tend
+  return j1 - j0
+
+def fate_map(mode, xs, bs, mu, c=None, sense=1, dt=.01, tmax=100.0, order=4,
+             rcoll=(.005, .001), rmax=3.0, phimax=5 * np.pi / 6, processes=None, rows=4):
+  """Computes the fate map for initial x0 values xs and, for mode 'xy', y0
+  values bs at Jacobi constant c, or for mode 'xv', v0 values bs. Returns
+  [code, tend] as arrays of shape (len(bs), len(xs)). The map is cut into
+  tiles of 'rows' rows that are spread over a pool of processes.
+  """
+  xs = np.asarray(xs, dtype=float)
+  bs = np.asarray(bs, dtype=float)
+  if mode not in ('xy', 'xv'):
+    raise ValueError("mode must be 'xy' or 'xv'")
+  if mode == 'xy' and c is None:
+    raise ValueError("mode 'xy' needs the Jacobi constant c")
+  shape = (bs.size, xs.size)
+  codes = RawArray('b', bs.size * xs.size)
+  times = RawArray('d', bs.size * xs.size)
+  tiles = [(j, min(j + rows, bs.size), mode, xs, bs, mu, c, sense, dt, tmax, order, rcoll, rmax, phimax)
+           for j in range(0, bs.size, rows)]
+  if processes == 1:
+    init_worker(codes, times, shape)
+    for tile in tiles:
+      scan_rows(tile)
+  else:
+    pool = Pool(processes, init_worker, (codes, times, shape))
+    try:
+      for n in pool.imap_unordered(scan_rows, tiles):
+        pass
+    finally:
+      pool.close()
+      pool.join()
+  code = np.frombuffer(codes, dtype=np.int8).reshape(shape).copy()
+  tend = np.frombuffer(times, dtype=np.float64).reshape(shape).copy()
+  return [code, tend]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : RESTRICTED THREEBODY PROBLEM (fate map)')
+  print('--------------------------------------------------------')
+  print('')
+  mu   = start_parameter('Mass parameter mu          : ', 1)
+  xmin = start_parameter('x(0) from                  : ', 2)
+  xmax = start_parameter('x(0) to                    : ', 3)
+  bmin = start_parameter('v(0) or y(0) from          : ', 4)
+  bmax = start_parameter('v(0) or y(0) to            : ', 5)
+  npts = int(start_parameter('Grid points per axis       : ', 6))
+  mode = sys.argv[7] if len(sys.argv) > 7 else 'xv'
+  n = 8
+  c = None
+  if mode == 'xy':
+    c = start_parameter('Jacobi constant C          : ', 8)
+    n = 9
+
+  [code, tend] = fate_map(mode, np.linspace(xmin, xmax, npts), np.linspace(bmin, bmax, npts), mu, c)
+  print('')
+  for k in range(len(NAMES)):
+    print('{:12s} : {:9d}'.format(NAMES[k], int(np.sum(code == k))))
+  if len(sys.argv) > n:
+    np.save(sys.argv[n], code)
+    print('Fate map saved in ' + sys.argv[n])
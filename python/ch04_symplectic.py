@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 4 - The Restricted Three-Body Problem : long-horizon propagation
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Headless, structure-preserving integration of the equations of motion in
+effes() of ch04_restricted_3_bodies.py. With the canonical momenta
+px = u - y and py = v + x the equations follow from the Hamiltonian
+
+  H = (px^2 + py^2) / 2 + y * px - x * py - (1 - mu) / r1 - mu / r2 = -C / 2
+
+where C is the Jacobi constant. H is split into a quadratic part, which is
+a drift in the rotating frame and is solved exactly, and the attraction of
+the two primaries, which is a kick on the momenta. The symmetric
+drift-kick composition is of order 2 and is raised to order 4 or 6 with
+Yoshida's coefficients. Only every 'every'-th state is written out, so the
+memory use does not grow with the number of steps.
+
+Examples:
+$ python ch04_symplectic.py 0.000953875 -0.509046125 0.883345912 0.0258975212 0.0149272418 0.1 1000000 10000
+for trojan orbit A of the text, 10^6 steps, written every 10^4 steps
+
+$ python ch04_symplectic.py 0.000953875 -0.647717531 0.0 0.0 -0.6828143998 0.01 1000000 10000 6 hilda.txt
+for the ideal Hilda orbit with the 6th order method, output to hilda.txt
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from math import sqrt, sin, cos
+import sys
+
+def effes(x, y, u, v, mu):
+  """Computes the right hand sides (fu and fv) of the differential equations
+  for the components of the velocity for input values of x,y,u and v, and mu
+  """
+  r1 = sqrt((x - mu) * (x - mu) + y * y)
+  r2 = sqrt((x + 1 - mu) * (x + 1 - mu) + y * y)
+  fu = -(1 - mu) * (x - mu) / r1**3 - mu * (x + 1 - mu) / r2**3 + x + 2 * v
+  fv = -(1 - mu) * y / r1**3 - mu * y / r2**3 + y - 2 * u
+  return [fu, fv]
+
+def jacobi(x, y, u, v, mu):
+  """Computes the Jacobi constant C for a position (x,y) and velocity (u,v)
+  """
+  r1 = sqrt((x - mu) * (x - mu) + y * y)
+  r2 = sqrt((x + 1 - mu) * (x + 1 - mu) + y * y)
+  return x * x + y * y + 2 * (1 - mu) / r1 + 2 * mu / r2 - u * u - v * v
+
+def coefficients(order):
+  """Returns the drift and kick coefficients of the composed method of the
+  given order (2, 4 or 6). A step is kick(d[0]) drift(c[0]) kick(d[1]) ...
+  drift(c[-1]) kick(d[-1]), with len(d) = len(c) + 1.
+  """
+  if order == 2:
+    w = [1.0]
+  elif order == 4:
+    w1 = 1 / (2 - 2**(1 / 3.0))
+    w = [w1, 1 - 2 * w1, w1]
+  elif order == 6:
+    # Yoshida (1990), solution A
+    w1 = -1.17767998417887
+    w2 = .235573213359357
+    w3 = .784513610477560
+    w0 = 1 - 2 * (w1 + w2 + w3)
+    w = [w3, w2, w1, w0, w1, w2, w3]
+  else:
+    raise ValueError('order must be 2, 4 or 6')
+
+  # each leapfrog stage kick(w/2) drift(w) kick(w/2) ; adjacent kicks merge
+  c = list(w)
+  d = [.5 * w[0]] + [.5 * (w[i] + w[i + 1]) for i in range(len(w) - 1)] + [.5 * w[-1]]
+  return [c, d]
+
+def propagate(x, y, u, v, mu, dt, nstep, every=1000, order=4):
+  """Generator that integrates an orbit over nstep steps of size dt and
+  yields (i, t, x, y, u, v, dc) every 'every' steps, where dc is the
+  relative drift of the Jacobi constant since the start
+  """
+  [c, d] = coefficients(order)
+  c0 = jacobi(x, y, u, v, mu)
+  mu1 = 1 - mu
+
+  # the drift is a rotation over angle c*dt combined with a free flight,
+  # its sines and cosines are computed only once
+  drifts = [(ci * dt, cos(ci * dt), sin(ci * dt)) for ci in c]
+  kicks = [di * dt for di in d]
+  last = kicks[-1]
+
+  px = u - y
+  py = v + x
+  pending = 0.0 # the last kick of a step is merged with the first of the next
+  for i in range(1, nstep + 1):
+    for j in range(len(drifts)):
+      # kick by the attraction of the two primaries
+      k = kicks[j] + pending
+      pending = 0.0
+      a = x - mu
+      b = x + mu1
+      yy = y * y
+      r1 = a * a + yy
+      r1 = r1 * sqrt(r1)
+      r2 = b * b + yy
+      r2 = r2 * sqrt(r2)
+      g1 = mu1 / r1
+      g2 = mu / r2
+      px = px - k * (g1 * a + g2 * b)
+      py = py - k * (g1 + g2) * y
+
+      # exact drift and rotation
+      h, cs, sn = drifts[j]
+      qx = x + h * px
+      qy = y + h * py
+      x = cs * qx + sn * qy
+      y = cs * qy - sn * qx
+      qx = px
+      px = cs * qx + sn * py
+      py = cs * py - sn * qx
+    pending = last
+
+    if i % every == 0 or i == nstep:
+      # complete the step to report a synchronised state
+      a = x - mu
+      b = x + mu1
+      yy = y * y
+      r1 = a * a + yy
+      r1 = r1 * sqrt(r1)
+      r2 = b * b + yy
+      r2 = r2 * sqrt(r2)
+      g1 = mu1 / r1
+      g2 = mu / r2
+      px = px - last * (g1 * a + g2 * b)
+      py = py - last * (g1 + g2) * y
+      pending = 0.0
+      u = px + y
+      v = py - x
+      yield (i, i * dt, x, y, u, v, (jacobi(x, y, u, v, mu) - c0) / abs(c0))
+
+def cauchy(x, y, u, v, mu, dt, nstep):
+  """Advances an orbit nstep steps with the Cauchy (midpoint) method of the
+  book program and returns the final state (x, y, u, v)
+  """
+  for i in range(nstep):
+    x1 = x + .5 * dt * u
+    y1 = y + .5 * dt * v
+    fu, fv = effes(x, y, u, v, mu)
+    u1 = u + .5 * dt * fu
+    v1 = v + .5 * dt * fv
+    x = x + dt * u1
+    y = y + dt * v1
+    fu, fv = effes(x1, y1, u1, v1, mu)
+    u = u + dt * fu
+    v = v + dt * fv
+  return [x, y, u, v]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : RESTRICTED THREEBODY PROBLEM (long runs)')
+  print('--------------------------------------------------------')
+  print('')
+  mu    = start_parameter('Mass parameter mu         : ', 1)
+  x     = start_parameter('Initial conditions : x(0) : ', 2)
+  y     = start_parameter('                     y(0) : ', 3)
+  u     = start_parameter('                     u(0) : ', 4)
+  v     = start_parameter('                     v(0) : ', 5)
+  dt    = start_parameter('Time step                 : ', 6)
+  nstep = int(start_parameter('Number of steps           : ', 7))
+  every = int(start_parameter('Output every ... steps    : ', 8))
+  order = int(sys.argv[9]) if len(sys.argv) > 9 else 4
+  out = open(sys.argv[10], 'w') if len(sys.argv) > 10 else sys.stdout
+
+  print('')
+  print('Jacobi constant C(0) = {: 15.12f}'.format(jacobi(x, y, u, v, mu)))
+  print('')
+  out.write('          i          t          x            y             u            v         dC/C\n')
+  worst = 0.0
+  for (i, t, x, y, u, v, dc) in propagate(x, y, u, v, mu, dt, nstep, every, order):
+    out.write('{:11d} {: 12.4f} {: 11.9f} {: 11.9f} {: 12.10f} {: 12.10f} {: 10.3e}\n'.format(i, t, x, y, u, v, dc))
+    worst = max(worst, abs(dc))
+    if out is not sys.stdout and i % (10 * every) == 0:
+      print('step {:11d}   t = {: 12.4f}   dC/C = {: 10.3e}   max |dC/C| = {: 10.3e}'.format(i, t, dc, worst))
+
+  print('')
+  print('Maximum relative Jacobi drift : {: 10.3e}'.format(worst))
+  if out is not sys.stdout:
+    out.close()
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 5 - Equipotential Surfaces of the Two-Body Problem : contour maps
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Instead of following one equipotential curve step by step, as
+ch05_equipotential_surfaces.py does, the potential V(x,y) is evaluated on a
+whole grid in one vectorized pass and the curves V = K are extracted for
+many values of K at once with the marching squares method. The critical
+levels through the Lagrange points L1, L2 and L3 are added by default.
+
+The first primary (mass 1 - mu) is at (mu, 0) and the second (mass mu) at
+(mu - 1, 0). L1 lies between the primaries, L2 beyond the second primary
+and L3 beyond the first.
+
+Example:
+$ python ch05_equipotential_map.py .4 -2 2 -2 2 801 curves.npz
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+
+def r1(x, y, mu):
+  """computes distance from points (x,y) to first primary
+  """
+  return np.sqrt((x - mu)**2 + y * y)
+
+def r2(x, y, mu):
+  """computes distance from points (x,y) to second primary
+  """
+  return np.sqrt((x + 1 - mu)**2 + y * y)
+
+def vxy(x, y, mu):
+  """evaluates potential energy function V(x,y) at points (x,y)
+  """
+  with np.errstate(divide='ignore'):
+    return (1 - mu) / r1(x, y, mu) + mu / r2(x, y, mu) + (x * x + y * y) / 2
+
+def dvdx(x, y, mu):
+  """evaluates partial derivative dV/dx in (x,y)
+  """
+  return -(1 - mu) * (x - mu) / r1(x, y, mu)**3 - mu * (x + 1 - mu) / r2(x, y, mu)**3 + x
+
+def dvdy(x, y, mu):
+  """evaluates partial derivative dV/dy in (x,y)
+  """
+  return -(1 - mu) * y / r1(x, y, mu)**3 - mu * y / r2(x, y, mu)**3 + y
+
+def collinear_points(mu):
+  """Computes the x coordinates [x1, x2, x3] of L1, L2 and L3 for a scalar
+  or an array of mass ratios mu. On the x-axis dV/dx increases
+  monotonically between the singularities, so each root is found by
+  bisection (vectorized over mu).
+  """
+  mu = np.asarray(mu, dtype=float)
+  brackets = [(mu - 1, mu), (mu - 2, mu - 1), (mu, mu + 1)]
+  roots = []
+  for (lo, hi) in brackets:
+    lo = lo + 0 * mu
+    hi = hi + 0 * mu
+    # the outer ends of L2 and L3 brackets are far enough from the primaries
+    for i in range(200):
+      mid = .5 * (lo + hi)
+      if np.all((mid == lo) | (mid == hi)):
+        break
+      with np.errstate(divide='ignore', invalid='ignore'):
+        up = dvdx(mid, 0 * mid, mu) > 0
+      hi = np.where(up, mid, hi)
+      lo = np.where(up, lo, mid)
+    roots.append(.5 * (lo + hi))
+  return roots
+
+def critical_levels(mu):
+  """Computes the potential values [K1, K2, K3, K45] at L1, L2, L3 and at
+  the triangular points L4/L5
+  """
+  [x1, x2, x3] = collinear_points(mu)
+  k45 = 1.5 - .5 * np.asarray(mu) * (1 - np.asarray(mu))
+  return [vxy(x1, 0, mu), vxy(x2, 0, mu), vxy(x3, 0, mu), k45]
+
+def potential_grid(mu, xs, ys):
+  """Evaluates V(x,y) on the grid of xs and ys, the result has shape
+  (len(ys), len(xs))
+  """
+  xs = np.asarray(xs, dtype=float)
+  ys = np.asarray(ys, dtype=float)
+  return vxy(xs[None, :], ys[:, None], mu)
+
+# marching squares : for each case (bit 1 = lower left, 2 = lower right,
+# 4 = upper right and 8 = upper left corner above the level) the pairs of
+# cell edges (0 = bottom, 1 = right, 2 = top, 3 = left) that are connected.
+# Cases 5 and 10 are saddles, resolved with the value at the cell centre.
+SEGMENTS = {1: [(3, 0)], 2: [(0, 1)], 3: [(3, 1)], 4: [(1, 2)], 6: [(0, 2)],
+            7: [(3, 2)], 8: [(3, 2)], 9: [(0, 2)], 11: [(1, 2)], 12: [(3, 1)],
+            13: [(0, 1)], 14: [(3, 0)]}
+SADDLES = {(5, True): [(0, 1), (3, 2)], (5, False): [(3, 0), (1, 2)],
+           (10, True): [(3, 0), (1, 2)], (10, False): [(0, 1), (3, 2)]}
+
+def contour_level(xs, ys, v, k):
+  """Extracts the curves v = k from a grid v of shape (len(ys), len(xs)).
+  Returns a list of polylines, each an array of shape (npoints, 2); closed
+  curves repeat their first point at the end.
+  """
+  ny, nx = v.shape
+  above = v > k
+  case = (above[:-1, :-1] * 1 + above[:-1, 1:] * 2 + above[1:, 1:] * 4 + above[1:, :-1] * 8)
+  centre = .25 * (v[:-1, :-1] + v[:-1, 1:] + v[1:, 1:] + v[1:, :-1]) > k
+
+  # global numbers of the cell edges : horizontal edges first, then vertical
+  nh = ny * (nx - 1)
+  jj, ii = np.mgrid[0:ny - 1, 0:nx - 1]
+  edges = [jj * (nx - 1) + ii, nh + jj * nx + ii + 1, (jj + 1) * (nx - 1) + ii, nh + jj * nx + ii]
+
+  # collect the segments of all cells as pairs of edge numbers
+  seg_a = []
+  seg_b = []
+  for c in range(1, 15):
+    for sad in ((True, False) if c in (5, 10) else (None,)):
+      sel = case == c
+      if sad is not None:
+        sel = sel & (centre == sad)
+        pairs = SADDLES[(c, sad)]
+      else:
+        pairs = SEGMENTS[c]
+      if not sel.any():
+        continue
+      for (ea, eb) in pairs:
+        seg_a.append(edges[ea][sel])
+        seg_b.append(edges[eb][sel])
+  if not seg_a:
+    return []
+  seg_a = np.concatenate(seg_a)
+  seg_b = np.concatenate(seg_b)
+
+  # crossing point on every edge that is used
+  used = np.unique(np.concatenate([seg_a, seg_b]))
+  px = np.empty(used.size)
+  py = np.empty(used.size)
+  hor = used < nh
+  j = used[hor] // (nx - 1)
+  i = used[hor] % (nx - 1)
+  v0 = v[j, i]
+  v1 = v[j, i + 1]
+  with np.errstate(invalid='ignore', divide='ignore'):
+    t = np.clip(np.nan_to_num((k - v0) / (v1 - v0)), 0, 1)
+  px[hor] = xs[i] + t * (xs[i + 1] - xs[i])
+  py[hor] = ys[j]
+  j = (used[~hor] - nh) // nx
+  i = (used[~hor] - nh) % nx
+  v0 = v[j, i]
+  v1 = v[j + 1, i]
+  with np.errstate(invalid='ignore', divide='ignore'):
+    t = np.clip(np.nan_to_num((k - v0) / (v1 - v0)), 0, 1)
+  px[~hor] = xs[i]
+  py[~hor] = ys[j] + t * (ys[j + 1] - ys[j])
+  point = dict(zip(used.tolist(), range(used.size)))
+
+  # chain the segments into polylines through their shared edges
+  neighbours = {}
+  for s, (a, b) in enumerate(zip(seg_a.tolist(), seg_b.tolist())):
+    neighbours.setdefault(a, []).append((s, b))
+    neighbours.setdefault(b, []).append((s, a))
+  done = np.zeros(seg_a.size, dtype=bool)
+
+  def walk(edge, chain):
+    while True:
+      nxt = [(s, e) for (s, e) in neighbours[edge] if not done[s]]
+      if not nxt:
+        return
+      s, edge = nxt[0]
+      done[s] = True
+      chain.append(edge)
+
+  curves = []
+  # open curves start at edges with only one segment (the grid boundary)
+  starts = [e for e in neighbours if len(neighbours[e]) == 1] + list(neighbours)
+  for e in starts:
+    if all(done[s] for (s, f) in neighbours[e]):
+      continue
+    chain = [e]
+    walk(e, chain)
+    if len(neighbours[e]) == 2:
+      # a closed curve, or an open one started in the middle : walk back
+      back = [e]
+      walk(e, back)
+      chain = back[::-1] + chain[1:]
+    idx = [point[q] for q in chain]
+    curves.append(np.column_stack([px[idx], py[idx]]))
+  return curves
+
+def equipotential_map(mu, xs, ys, levels=(), critical=True):
+  """Computes the potential on the grid (xs, ys) and the equipotential
+  curves for the given levels K, to which the critical levels through L1,
+  L2 and L3 are added when critical is true. Returns [v, levels, curves],
+  where curves[i] is the list of polylines of levels[i].
+  """
+  xs = np.asarray(xs, dtype=float)
+  ys = np.asarray(ys, dtype=float)
+  v = potential_grid(mu, xs, ys)
+  levels = list(levels)
+  if critical:
+    levels = levels + [float(k) for k in critical_levels(mu)[:3]]
+  curves = [contour_level(xs, ys, v, k) for k in levels]
+  return [v, np.array(levels), curves]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : EQUIPOTENTIAL CURVES (contour map)')
+  print('--------------------------------------------------------')
+  print('')
+  mu   = start_parameter('Mass parameter mu : ', 1)
+  xmin = start_parameter('x from            : ', 2)
+  xmax = start_parameter('x to              : ', 3)
+  ymin = start_parameter('y from            : ', 4)
+  ymax = start_parameter('y to              : ', 5)
+  npts = int(start_parameter('Grid points per axis : ', 6))
+
+  [x1, x2, x3] = collinear_points(mu)
+  [k1, k2, k3, k45] = critical_levels(mu)
+  print('')
+  print('L1 : x = {: 11.7f}   K = {: 11.7f}'.format(float(x1), float(k1)))
+  print('L2 : x = {: 11.7f}   K = {: 11.7f}'.format(float(x2), float(k2)))
+  print('L3 : x = {: 11.7f}   K = {: 11.7f}'.format(float(x3), float(k3)))
+  print('L4, L5 :          K = {: 11.7f}'.format(float(k45)))
+
+  levels = np.linspace(1.55, 2.5, 20)
+  [v, levels, curves] = equipotential_map(mu, np.linspace(xmin, xmax, npts), np.linspace(ymin, ymax, npts), levels)
+  print('')
+  print('    K         curves   points')
+  for k, c in zip(levels, curves):
+    print('{: 11.7f} {:6d} {:8d}'.format(k, len(c), sum(len(q) for q in c)))
+
+  if len(sys.argv) > 7:
+    # all curves of a level are stored in one array, separated by NaN rows
+    sep = np.full((1, 2), np.nan)
+    packed = dict(('curve_{:d}'.format(i), np.concatenate(sum([[q, sep] for q in c], [])) if c else np.zeros((0, 2)))
+                  for i, c in enumerate(curves))
+    np.savez(sys.argv[7], mu=mu, levels=levels, **packed)
+    print('Curves saved in ' + sys.argv[7])
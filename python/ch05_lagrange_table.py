@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 5 - Equipotential Surfaces of the Two-Body Problem : Lagrange table
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+The potential V(x,y) of ch05 and the force in effes() of ch04 have the same
+five Lagrange points. This module solves for all of them, their potential
+values K and the volume-equivalent radii of both Roche lobes, for a whole
+vector of mass ratios mu at once. The results are tabulated on a grid in
+log10(mu), stored in the cache directory (see numerics.py) and kept in
+memory, so lookups for millions of mass ratios are only an interpolation.
+
+Distances are in units of the separation of the primaries. The first
+primary (mass 1 - mu) is at (mu, 0), the second (mass mu) at (mu - 1, 0).
+rl1 and rl2 are the Roche-lobe radii of the first and second primary.
+
+Example:
+$ python ch05_lagrange_table.py .4
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch05_equipotential_map import collinear_points, critical_levels
+from numerics import cached_table, lagrange4
+import numpy as np
+
+def lagrange_points(mu):
+  """Computes the Lagrange points for a scalar or an array of mu. Returns a
+  dict with x1, x2, x3 (on the x-axis), x4, y4 (L5 is (x4, -y4)) and the
+  potential values k1, k2, k3 and k45.
+  """
+  mu = np.asarray(mu, dtype=float)
+  [x1, x2, x3] = collinear_points(mu)
+  [k1, k2, k3, k45] = critical_levels(mu)
+  return {'x1': x1, 'x2': x2, 'x3': x3, 'x4': mu - .5, 'y4': np.sqrt(3) / 2 + 0 * mu,
+          'k1': k1, 'k2': k2, 'k3': k3, 'k45': k45}
+
+def lobe_radius(mu, which, k, dmax, ncos=48, nphi=96, nsample=64):
+  """Computes the volume-equivalent radius of the lobe V > k around the
+  first (which = 1) or second (which = 2) primary. Rays are cast from the
+  primary on a Gauss-Legendre grid in cos(theta) (theta from the z-axis)
+  and a uniform grid in phi, using the symmetry in y and z. dmax is the
+  distance from the primary to L1, the farthest point of the lobe.
+  """
+  if which == 1:
+    [centre, mself, other, mother] = [mu, 1 - mu, mu - 1, mu]
+  else:
+    [centre, mself, other, mother] = [mu - 1, mu, mu, 1 - mu]
+  c, w = np.polynomial.legendre.leggauss(ncos)
+  c = .5 * (c + 1)
+  w = .5 * w
+  phi = (np.arange(nphi) + .5) * np.pi / nphi
+  ct, ph = np.meshgrid(c, phi, indexing='ij')
+  st = np.sqrt(1 - ct * ct)
+  nx = (st * np.cos(ph)).ravel()
+  ny = (st * np.sin(ph)).ravel()
+  nz = ct.ravel()
+
+  def v(r):
+    """3-D potential along the rays at distances r from the primary
+    """
+    x = centre + r * nx
+    y = r * ny
+    z = r * nz
+    return mself / r + mother / np.sqrt((x - other)**2 + y * y + z * z) + (x * x + y * y) / 2
+
+  # first sample along each ray where the potential drops below k
+  rs = dmax * np.arange(1, nsample + 1) / nsample
+  vs = np.array([v(r) for r in rs])
+  below = vs < k
+  first = np.where(below.any(axis=0), below.argmax(axis=0), nsample)
+  hi = np.where(first < nsample, rs[np.minimum(first, nsample - 1)], dmax)
+  lo = np.where(first > 0, rs[np.maximum(first - 1, 0)], 0)
+  lo = np.where(first == 0, 1e-3 * dmax, lo)
+  inside = first < nsample
+  for i in range(60):
+    mid = .5 * (lo + hi)
+    up = v(mid) > k
+    lo = np.where(up & inside, mid, lo)
+    hi = np.where(up | ~inside, hi, mid)
+  r = np.where(inside, .5 * (lo + hi), dmax)
+
+  # volume = integral of r^3 / 3 over the solid angle (4 symmetric parts)
+  vol = 4 * np.sum(np.repeat(w, nphi) * (np.pi / nphi) * r**3 / 3)
+  return (3 * vol / 4 / np.pi)**(1 / 3.0)
+
+def roche_radii(mu, ncos=48, nphi=96):
+  """Computes the volume-equivalent Roche-lobe radii [rl1, rl2] of the
+  first and second primary for a scalar or an array of mu
+  """
+  mu = np.atleast_1d(np.asarray(mu, dtype=float))
+  rl1 = np.empty(mu.shape)
+  rl2 = np.empty(mu.shape)
+  for i in range(mu.size):
+    m = mu.flat[i]
+    [x1, x2, x3] = collinear_points(m)
+    [k1, k2, k3, k45] = critical_levels(m)
+    rl1.flat[i] = lobe_radius(m, 1, k1, m - x1, ncos, nphi)
+    rl2.flat[i] = lobe_radius(m, 2, k1, x1 - (m - 1), ncos, nphi)
+  return [rl1, rl2]
+
+def solve(mu):
+  """Solves all the quantities of the table for an array of mu (no
+  interpolation). Returns a dict of arrays.
+  """
+  res = lagrange_points(mu)
+  [res['rl1'], res['rl2']] = roche_radii(mu)
+  return res
+
+# the table stores positive distances and radii as logarithms, so that the
+# power laws of small mu become straight lines in log10(mu)
+LOGS = {'d1': lambda r, mu: r['x1'] - (mu - 1), 'd2': lambda r, mu: (mu - 1) - r['x2'],
+        'd3': lambda r, mu: r['x3'] - mu, 'rl1': lambda r, mu: r['rl1'], 'rl2': lambda r, mu: r['rl2']}
+LEVELS = ['k1', 'k2', 'k3']
+
+# tables already loaded, by (lmin, lmax, n)
+tables = {}
+
+def table(lmin=-7.0, lmax=np.log10(.5), n=701):
+  """Returns the table for n values of log10(mu) from lmin to lmax. It is
+  computed once, then read from the cache directory or from memory.
+  """
+  key = (float(lmin), float(lmax), int(n))
+  if key not in tables:
+    def build():
+      lmu = np.linspace(lmin, lmax, n)
+      mu = 10**lmu
+      res = solve(mu)
+      out = {'lmu': lmu}
+      for name in LOGS:
+        out['log_' + name] = np.log10(LOGS[name](res, mu))
+      for name in LEVELS:
+        out[name] = res[name]
+      return out
+    tables[key] = cached_table('lagrange_{0:.4f}_{1:.4f}_{2:d}.npz'.format(key[0], key[1], key[2]), build)
+  return tables[key]
+
+def lookup(mu, tab=None):
+  """Interpolates the table for a scalar or an array of mu. Returns the same
+  dict as lagrange_points(), with rl1 and rl2 added. mu outside the table
+  gives NaN.
+  """
+  tab = table() if tab is None else tab
+  mu = np.asarray(mu, dtype=float)
+  lmu = tab['lmu']
+  with np.errstate(divide='ignore', invalid='ignore'):
+    s = np.log10(mu)
+  dl = (lmu[-1] - lmu[0]) / (len(lmu) - 1)
+  names = ['log_' + name for name in LOGS] + LEVELS
+  vals = lagrange4(s, lmu[0], dl, np.column_stack([tab[name] for name in names]))
+  out = dict((name, vals[..., i]) for i, name in enumerate(names))
+  d1, d2, d3, rl1, rl2 = [10**out['log_' + name] for name in ['d1', 'd2', 'd3', 'rl1', 'rl2']]
+  res = {'x1': mu - 1 + d1, 'x2': mu - 1 - d2, 'x3': mu + d3, 'x4': mu - .5, 'y4': np.sqrt(3) / 2 + 0 * mu,
+         'rl1': rl1, 'rl2': rl2}
+  for name in LEVELS:
+    res[name] = out[name]
+  res['k45'] = 1.5 - .5 * mu * (1 - mu)
+  return res
+
+def eggleton(q):
+  """Eggleton's (1983) approximation of the Roche-lobe radius of a star
+  with mass ratio q = M(star) / M(companion)
+  """
+  q3 = np.asarray(q, dtype=float)**(1 / 3.0)
+  return .49 * q3 * q3 / (.6 * q3 * q3 + np.log(1 + q3))
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : LAGRANGE POINTS AND ROCHE LOBES')
+  print('--------------------------------------------------------')
+  print('')
+  mu = start_parameter('Mass parameter mu : ', 1)
+
+  res = solve(mu)
+  tab = lookup(mu)
+  print('')
+  print('              solved         table         difference')
+  for name in ['x1', 'x2', 'x3', 'x4', 'y4', 'k1', 'k2', 'k3', 'k45', 'rl1', 'rl2']:
+    a = float(np.ravel(res[name])[0])
+    b = float(tab[name])
+    print('{:4s} {: 14.10f} {: 14.10f} {: 12.3e}'.format(name, a, b, b - a))
+  print('')
+  print('Eggleton approximation : rl1 = {: 9.6f}   rl2 = {: 9.6f}'.format(float(eggleton((1 - mu) / mu)), float(eggleton(mu / (1 - mu)))))
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 6 - The Dynamical Parallax : catalog mode
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Runs the iteration of ch06_dynamical_parallax.py for a whole catalog of
+binaries. The catalog is a CSV or whitespace separated text file with the
+columns P (years), a (arc seconds), mv1, mv2, bc1 and bc2; lines starting
+with # and a header line are skipped. The file is read in chunks and the
+iteration runs vectorized over each chunk, with a mask that freezes the
+rows that have converged. The results are appended to the output file after
+each chunk, so the memory use does not depend on the size of the catalog.
+Rows that do not converge within 15 iterations are flagged with
+converged = 0 and do not stop the run.
+
+Example:
+$ python ch06_parallax_catalog.py binaries.csv results.csv
+"""
+
+from __future__ import print_function, division
+import sys
+import numpy as np
+
+COLUMNS = ['P', 'a', 'mv1', 'mv2', 'bc1', 'bc2']
+OUTPUT = COLUMNS + ['m1', 'm2', 'par', 'dist', 'Mb1', 'Mb2', 'converged', 'iterations']
+
+def dynamical_parallax(p, a, mv1, mv2, bc1, bc2, eps=.01, maxiter=15):
+  """Solves the masses, the parallax and the distance (light years) for
+  arrays of binaries, starting from masses of 1 Mo. Returns [m1, m2, par,
+  dis, mb1, mb2, converged, iterations].
+  """
+  p, a, mv1, mv2, bc1, bc2 = [np.array(q, dtype=float) for q in np.broadcast_arrays(p, a, mv1, mv2, bc1, bc2)]
+  shape = p.shape
+
+  # select starting values for the two masses
+  m1 = np.ones(shape)
+  m2 = np.ones(shape)
+  m11 = np.full(shape, np.nan)
+  m22 = np.full(shape, np.nan)
+  par = np.full(shape, np.nan)
+  dis = np.full(shape, np.nan)
+  mb1 = np.full(shape, np.nan)
+  mb2 = np.full(shape, np.nan)
+  converged = np.zeros(shape, dtype=bool)
+  iterations = np.zeros(shape, dtype=np.int16)
+  act = np.ones(shape, dtype=bool)
+
+  with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+    for i in range(1, maxiter + 1):
+      # compute new approximations for the two masses of the active rows
+      pa = a[act] / p[act]**(2 / 3.0) / (m1[act] + m2[act])**(1 / 3.0)
+      mabs1 = mv1[act] + 5 + 5 * np.log10(pa)
+      mabs2 = mv2[act] + 5 + 5 * np.log10(pa)
+      b1 = mabs1 - bc1[act]
+      b2 = mabs2 - bc2[act]
+      n1 = 10**(.58 - .112 * b1)
+      n2 = 10**(.58 - .112 * b2)
+      par[act] = pa
+      dis[act] = 1 / pa * 3.26
+      mb1[act] = b1
+      mb2[act] = b2
+      m11[act] = n1
+      m22[act] = n2
+      iterations[act] = i
+
+      # check convergence; the other rows continue with the new masses
+      ok = (np.abs(m1[act] - n1) < eps) & (np.abs(m2[act] - n2) < eps)
+      idx = np.flatnonzero(act)
+      converged[idx[ok]] = True
+      m1[idx[~ok]] = n1[~ok]
+      m2[idx[~ok]] = n2[~ok]
+      act[idx[ok]] = False
+      # rows that became NaN can never converge
+      act[idx[~ok & ~(np.isfinite(n1) & np.isfinite(n2))]] = False
+      if not act.any():
+        break
+  return [m11, m22, par, dis, mb1, mb2, converged, iterations]
+
+def read_chunks(f, chunk=100000):
+  """Generator that reads the catalog from the open file f and yields
+  arrays of shape (rows, 6) with at most chunk rows each
+  """
+  delimiter = None
+  lines = []
+  for line in f:
+    line = line.strip()
+    if not line or line.startswith('#'):
+      continue
+    if delimiter is None:
+      delimiter = ',' if ',' in line else ''
+      try:
+        [float(v) for v in (line.split(',') if delimiter else line.split())[:6]]
+      except ValueError:
+        continue # header line
+    lines.append(line)
+    if len(lines) == chunk:
+      yield np.loadtxt(lines, delimiter=delimiter or None, usecols=range(6), ndmin=2)
+      lines = []
+  if lines:
+    yield np.loadtxt(lines, delimiter=delimiter or None, usecols=range(6), ndmin=2)
+
+def process_catalog(inp, out, chunk=100000, eps=.01, maxiter=15):
+  """Reads the catalog from the open file inp chunk by chunk and writes the
+  input columns with the results as CSV to the open file out. Returns the
+  numbers of rows and of rows that did not converge.
+  """
+  out.write(','.join(OUTPUT) + '\n')
+  nrows = 0
+  nbad = 0
+  for data in read_chunks(inp, chunk):
+    [m1, m2, par, dis, mb1, mb2, converged, iterations] = dynamical_parallax(*data.T, eps=eps, maxiter=maxiter)
+    res = np.column_stack([data, m1, m2, par, dis, mb1, mb2, converged, iterations])
+    np.savetxt(out, res, delimiter=',', fmt=['%.6g'] * 6 + ['%.6f', '%.6f', '%.6e', '%.6f', '%.4f', '%.4f', '%d', '%d'])
+    nrows = nrows + len(data)
+    nbad = nbad + int(np.sum(~converged))
+  return [nrows, nbad]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : DYNAMICAL PARALLAX (catalog)')
+  print('--------------------------------------------------------')
+  print('')
+  if len(sys.argv) < 3:
+    print('Usage : python ch06_parallax_catalog.py catalog output.csv [chunk size]')
+    sys.exit(1)
+  chunk = int(sys.argv[3]) if len(sys.argv) > 3 else 100000
+  with open(sys.argv[1]) as inp:
+    with open(sys.argv[2], 'w') as out:
+      [nrows, nbad] = process_catalog(inp, out, chunk)
+  print('Rows processed          : {:d}'.format(nrows))
+  print('Rows without convergence : {:d}'.format(nbad))
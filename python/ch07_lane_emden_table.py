@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 7 - Polytropes : precomputed Lane-Emden solutions
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+The dimensionless solution f(x), h(x) of the Lane-Emden equation depends only
+on the polytrope index n; the mass and the radius of the star only rescale
+it. Here the equation is integrated once for a whole grid of indices at the
+same time (n = 0 to 4.9 in steps of 0.01) and the results are stored in the
+cache directory (see numerics.py) : f and h on the grid x = xm * k / K, the
+surface xm and -xm^2 * hm. Other indices are answered by interpolation in n,
+with a least-recently-used cache in memory in front of the table, so the
+characteristics pc, dm, dc, lambda and rn of ch07_polytropes.py take
+microseconds.
+
+Example:
+$ python ch07_lane_emden_table.py 1.5 2 3
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from numerics import cached_table, lagrange4, lru_cache
+import numpy as np
+
+# grid of the table
+NMIN = 0.0
+NMAX = 4.9
+DN = .01
+K = 2000
+
+def series(n, x):
+  """Computes f and h near the centre from the series expansion
+  """
+  f = 1 - x * x / 6.0 + n * x**4 / 120.0 - n * (8 * n - 5) * x**6 / 15120.0
+  h = -x / 3.0 + n * x**3 / 30.0 - n * (8 * n - 5) * x**5 / 2520.0
+  return [f, h]
+
+def rk4(n, x, f, h, dx):
+  """Advances f and h with one Runge-Kutta step of size dx (arrays of n,
+  f, h and dx; x scalar or array). Beyond the surface f**n is taken as 0.
+  """
+  def rhs(x, f, h):
+    return [h, -np.maximum(f, 0)**n - 2 * h / x]
+  [a1, b1] = rhs(x, f, h)
+  [a2, b2] = rhs(x + .5 * dx, f + .5 * dx * a1, h + .5 * dx * b1)
+  [a3, b3] = rhs(x + .5 * dx, f + .5 * dx * a2, h + .5 * dx * b2)
+  [a4, b4] = rhs(x + dx, f + dx * a3, h + dx * b3)
+  return [f + dx / 6.0 * (a1 + 2 * a2 + 2 * a3 + a4), h + dx / 6.0 * (b1 + 2 * b2 + 2 * b3 + b4)]
+
+def surfaces(ns, x0=.01):
+  """Finds the surface xm (first zero of f) for an array of indices ns by
+  integrating them all together. The zero is located on the cubic Hermite
+  interpolant of the step in which f changes sign.
+  """
+  ns = np.asarray(ns, dtype=float)
+  xm = np.full(ns.shape, np.nan)
+  idx = np.arange(ns.size)
+  n = ns.copy()
+  [f, h] = series(n, x0)
+  x = x0
+  while idx.size > 0:
+    dx = 1e-3 * (1 + x)
+    [f1, h1] = rk4(n, x, f, h, dx)
+    hit = f1 <= 0
+    if hit.any():
+      # bisection on the Hermite interpolant of the step
+      fa, ha, fb, hb = f[hit], h[hit] * dx, f1[hit], h1[hit] * dx
+      lo = np.zeros(fa.shape)
+      hi = np.ones(fa.shape)
+      for i in range(60):
+        t = .5 * (lo + hi)
+        p = ((2 * t**3 - 3 * t * t + 1) * fa + (t**3 - 2 * t * t + t) * ha +
+             (-2 * t**3 + 3 * t * t) * fb + (t**3 - t * t) * hb)
+        lo = np.where(p > 0, t, lo)
+        hi = np.where(p > 0, hi, t)
+      xm[idx[hit]] = x + .5 * (lo + hi) * dx
+      keep = ~hit
+      idx, n, f1, h1 = idx[keep], n[keep], f1[keep], h1[keep]
+    x = x + dx
+    f, h = f1, h1
+  return xm
+
+def integrate(ns, k=K):
+  """Integrates the Lane-Emden equation for an array of indices ns and
+  returns [xm, f, h] with f and h of shape (len(ns), k + 1), sampled at
+  x = xm * j / k for j = 0 ... k
+  """
+  ns = np.asarray(ns, dtype=float)
+  xm = surfaces(ns)
+  dx = xm / k
+  f = np.empty((ns.size, k + 1))
+  h = np.empty((ns.size, k + 1))
+  f[:, 0] = 1.0
+  h[:, 0] = 0.0
+  [f[:, 1], h[:, 1]] = series(ns, dx)
+  for j in range(1, k):
+    [f[:, j + 1], h[:, j + 1]] = rk4(ns, j * dx, f[:, j], h[:, j], dx)
+  return [xm, f, h]
+
+def build():
+  """Computes the table for the grid NMIN ... NMAX
+  """
+  ns = np.linspace(NMIN, NMAX, int(round((NMAX - NMIN) / DN)) + 1)
+  [xm, f, h] = integrate(ns)
+  hm = h[:, -1]
+  return {'n': ns, 'xm': xm, 'mun': -xm * xm * hm, 'f': f, 'h': h}
+
+# table in memory, loaded from the cache directory on first use
+tables = {}
+
+def table():
+  """Returns the table (a dict of arrays n, xm, mun, f and h)
+  """
+  if 'le' not in tables:
+    tables['le'] = cached_table('lane_emden_{0:g}_{1:g}_{2:g}_{3:d}.npz'.format(NMIN, NMAX, DN, K), build)
+  return tables['le']
+
+@lru_cache(4096)
+def surface(n):
+  """Returns (xm, -xm^2 * hm) for index n, interpolated in the table
+  """
+  tab = table()
+  [lxm, lmu] = lagrange4(n, tab['n'][0], DN, np.column_stack([np.log(tab['xm']), np.log(tab['mun'])]))
+  return (float(np.exp(lxm)), float(np.exp(lmu)))
+
+@lru_cache(256)
+def column(n):
+  """Returns the columns f and h of the table interpolated at index n
+  """
+  tab = table()
+  return (lagrange4(n, tab['n'][0], DN, tab['f']), lagrange4(n, tab['n'][0], DN, tab['h']))
+
+def profile(n, x):
+  """Computes f(x) and h(x) for index n at the points x (NaN outside the
+  star)
+  """
+  (xm, mun) = surface(float(n))
+  (fc, hc) = column(float(n))
+  xi = np.asarray(x, dtype=float) / xm
+  return [lagrange4(xi, 0.0, 1.0 / K, fc), lagrange4(xi, 0.0, 1.0 / K, hc)]
+
+def characteristics(n, mass, radius):
+  """Computes the general characteristics of ch07_polytropes.py for index
+  n, mass and radius (in solar units) : [pc, dm, dc, lam, rn, xm, mun]
+  """
+  (xm, mun) = surface(float(n))
+  hm = -mun / xm / xm
+  pc = 9.048e14 * mass * mass / (n + 1) / hm / hm / radius**4
+  dm = 1.42 * mass / radius**3
+  dc = -dm * xm / 3.0 / hm
+  lam = mun / mass
+  rn = radius / xm
+  return [pc, dm, dc, lam, rn, xm, mun]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : POLYTROPES (table)')
+  print('--------------------------------------------------------')
+  print('')
+  n    = start_parameter('polytrope index : ', 1)
+  mass = start_parameter('mass            : ', 2)
+  rad  = start_parameter('radius          : ', 3)
+
+  [pc, dm, dc, lam, rn, xm, mun] = characteristics(n, mass, rad)
+  print('')
+  print('central pressure (Pc) : ', pc)
+  print('average density (dm)  : ', dm)
+  print('central density (dc)  : ', dc)
+  print('mass parameter (L)    : ', lam)
+  print('distance unit (rn)    : ', rn)
+  print('x-final               : {: 10.4f} '.format(xm))
+  print('-x2*h (final)         : {: 10.4f} '.format(mun))
+
+  print('')
+  print('   x = r/rn       f           h        log(P/Pc)   log(d/dC)     l*mr')
+  x = np.linspace(0, xm, 11)
+  [f, h] = profile(n, x)
+  with np.errstate(divide='ignore'):
+    for i in range(len(x)):
+      print('{: 9.4f} {: 11.5f} {: 11.5f} {: 11.4f} {: 11.4f} {: 11.4f}'.format(x[i], f[i], h[i], np.log10(max(f[i], 0)**(n + 1)), np.log10(max(f[i], 0)**n), -x[i] * x[i] * h[i]))
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 7 - Polytropes : high-order Lane-Emden integrator
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch07_polytropes.py integrates the Lane-Emden equation with the midpoint
+method and finds the surface by linear extrapolation (xm = x - f/h), so an
+accurate xm needs very small steps. Here the equation
+
+  x f'' + 2 f' + x f^n = 0
+
+is integrated with a Taylor series method of high order. The Taylor
+coefficients of f^n follow from those of f with J.C.P. Miller's recurrence,
+so every step is a polynomial that also gives f and h = f' anywhere inside
+the step (dense output). The first step uses the series in x^2 around the
+centre; the step size follows from the decay of the last coefficients.
+The surface f = 0 is located by root finding on the polynomial of the
+last step. For non-integer n the solution has a branch point at the
+surface itself; there the steps approach the surface geometrically and the
+last gap is closed with the local expansion f = A s (1 + s/xm), s = xm - x.
+
+Example:
+$ python ch07_lane_emden_taylor.py 1.5
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from numerics import brentq
+from math import sqrt, pi
+import numpy as np
+
+def centre_series(n, order):
+  """Computes the coefficients c_k of f = sum c_k u^k with u = x^2
+  """
+  c = np.zeros(order + 1)
+  d = np.zeros(order + 1)
+  c[0] = 1.0
+  d[0] = 1.0
+  for k in range(order):
+    # d = f^n (Miller's recurrence), then c from the differential equation
+    if k > 0:
+      j = np.arange(1, k + 1)
+      d[k] = np.sum(((n + 1) * j - k) * c[j] * d[k - j]) / k / c[0]
+    c[k + 1] = -d[k] / ((2 * k + 2) * (2 * k + 3))
+  return c
+
+def taylor_coefficients(n, x0, f0, h0, order):
+  """Computes the Taylor coefficients a_k of f(x0 + t) from f(x0) = f0 and
+  f'(x0) = h0
+  """
+  a = np.zeros(order + 1)
+  b = np.zeros(order + 1)
+  a[0] = f0
+  a[1] = h0
+  b[0] = f0**n
+  for k in range(order - 1):
+    if k > 0:
+      j = np.arange(1, k + 1)
+      b[k] = np.sum(((n + 1) * j - k) * a[j] * b[k - j]) / k / a[0]
+    a[k + 2] = -((k + 1) * (k + 2) * a[k + 1] + x0 * b[k] + (b[k - 1] if k > 0 else 0)) / (x0 * (k + 1) * (k + 2))
+  return a
+
+def horner(a, t):
+  """Evaluates the polynomial sum a_k t^k and its derivative
+  """
+  p = 0.0
+  dp = 0.0
+  for k in range(len(a) - 1, -1, -1):
+    dp = dp * t + p
+    p = p * t + a[k]
+  return [p, dp]
+
+def step_size(a, tol):
+  """Estimates the step size from the last two Taylor coefficients
+  """
+  k = len(a) - 1
+  scale = max(1.0, abs(a[0]))
+  hs = [(tol * scale / abs(a[i]))**(1.0 / i) for i in (k - 1, k) if a[i] != 0]
+  return min(hs) if hs else np.inf
+
+def solve(n, tol=1e-16, order=30, xmax=1e4, shrink=.5):
+  """Integrates the Lane-Emden equation for index n up to the surface (or
+  up to xmax when there is none, n >= 5). Returns a dict with xm, hm,
+  mun = -xm^2 hm, the number of steps, and the steps themselves (starts x0
+  and Taylor coefficients) for dense output.
+  """
+  integer = float(n) == int(n)
+  steps = []
+  res = {'xm': np.nan, 'hm': np.nan, 'mun': np.nan}
+
+  # first step with the series in u = x^2 around the centre
+  c = centre_series(n, order)
+  u1 = shrink * step_size(c, tol)
+  x = min(sqrt(u1), xmax)
+  fu = lambda xx: horner(c, xx * xx)
+  steps.append((0.0, c))
+  [f, dfu] = fu(x)
+  if f <= 0:
+    xm = brentq(lambda xx: fu(xx)[0], 0, x)
+    [fm, dfu] = fu(xm)
+    res.update({'xm': xm, 'hm': 2 * xm * dfu})
+  else:
+    h = 2 * x * dfu
+    while x < xmax:
+      a = taylor_coefficients(n, x, f, h, order)
+      dx = min(shrink * step_size(a, tol), xmax - x)
+      [f1, h1] = horner(a, dx)
+      if f1 <= 0 and not integer:
+        # the surface is a branch point : never step across it
+        while f1 <= 0:
+          dx = .5 * dx
+          [f1, h1] = horner(a, dx)
+      if f1 <= 0:
+        steps.append((x, a))
+        t = brentq(lambda tt: horner(a, tt)[0], 0, dx)
+        res.update({'xm': x + t, 'hm': horner(a, t)[1]})
+        break
+      steps.append((x, a))
+      x = x + dx
+      [f, h] = [f1, h1]
+
+      # close the last gap near the surface with the local expansion
+      s = f / -h
+      if not integer and h < 0 and s < 1e-6 * x:
+        for i in range(3):
+          s = f / -h * (1 + 2 * s / (x + s)) / (1 + s / (x + s))
+        xm = x + s
+        # h' = -f^n - 2h/x integrated over the gap with f = -h (xm - x)
+        hm = h * (1 - 2 * np.log(xm / x)) - (-h)**n * s**(n + 1) / (n + 1)
+        res.update({'xm': xm, 'hm': hm})
+        break
+  res['mun'] = -res['xm']**2 * res['hm']
+  res['steps'] = steps
+  res['nstep'] = len(steps)
+  res['order'] = order
+  return res
+
+def dense(sol, x):
+  """Evaluates f(x) and h(x) from the steps of a solution of solve()
+  """
+  x = np.atleast_1d(np.asarray(x, dtype=float))
+  starts = np.array([s[0] for s in sol['steps']])
+  which = np.clip(np.searchsorted(starts, x, side='right') - 1, 0, len(starts) - 1)
+  f = np.empty(x.shape)
+  h = np.empty(x.shape)
+  for i in range(x.size):
+    (x0, a) = sol['steps'][which[i]]
+    if which[i] == 0:
+      [p, dp] = horner(a, x[i] * x[i])
+      [f[i], h[i]] = [p, 2 * x[i] * dp]
+    else:
+      [f[i], h[i]] = horner(a, x[i] - x0)
+  return [f, h]
+
+def midpoint(n, dr):
+  """Runs the midpoint method of ch07_polytropes.py with step dr and
+  returns [xm, mun, number of steps]
+  """
+  x = dr
+  f = 1.0 - x**2 / 6.0 + x**4 * n / 120.0
+  h = -x / 3.0 + x**3 * n / 30.0
+  i = 1
+  while True:
+    x12 = x + .5 * dr
+    f12 = f + .5 * dr * h
+    if f12 <= 0:
+      break
+    h12 = h + .5 * dr * (-f**n - 2 * h / x)
+    f1 = f + dr * h12
+    if f1 <= 0:
+      break
+    h = h + dr * (-f12**n - 2 * h12 / x12)
+    f = f1
+    x = x + dr
+    i = i + 1
+  xm = x - f / h
+  hm = h + (xm - x) * (-f**n - 2 * h / x)
+  return [xm, -xm * xm * hm, i]
+
+# analytic solutions : xm and mun for n = 0 and 1, f(x) for n = 0, 1 and 5
+EXACT = {0: (sqrt(6), 2 * sqrt(6), lambda x: 1 - x * x / 6),
+         1: (pi, pi, lambda x: np.sin(x) / x),
+         5: (np.inf, sqrt(3), lambda x: 1 / np.sqrt(1 + x * x / 3))}
+
+def check(tol=1e-16, order=30):
+  """Compares the integrator with the analytic solutions for n = 0, 1 and
+  5 (up to x = 100). Returns a list of rows (n, steps, error of xm, error
+  of mun, max error of f).
+  """
+  rows = []
+  for n in (0, 1, 5):
+    (xm, mun, fx) = EXACT[n]
+    sol = solve(n, tol, order, xmax=100.0 if n == 5 else 1e4)
+    x = np.linspace(.01, min(sol['xm'], 100.0) if np.isfinite(sol['xm']) else 100.0, 201)
+    [f, h] = dense(sol, x)
+    if n == 5:
+      # at x = 100 the mass -x^2 h is still 3 % below sqrt(3)
+      xx = 100.0
+      mun_x = xx**3 / 3.0 / (1 + xx * xx / 3)**1.5
+      [f1, h1] = dense(sol, xx)
+      err_mun = -xx * xx * h1[0] - mun_x
+      err_xm = np.nan
+    else:
+      err_xm = sol['xm'] - xm
+      err_mun = sol['mun'] - mun
+    rows.append((n, sol['nstep'], err_xm, err_mun, np.max(np.abs(f - fx(x)))))
+  return rows
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : POLYTROPES (high-order integrator)')
+  print('--------------------------------------------------------')
+  print('')
+  n = start_parameter('polytrope index : ', 1)
+
+  sol = solve(n)
+  print('')
+  print('x-final               : {: 18.14f}'.format(sol['xm']))
+  print('-x2*h (final)         : {: 18.14f}'.format(sol['mun']))
+  print('steps of order {:d}     : {:d}'.format(sol['order'], sol['nstep']))
+
+  print('')
+  print('Check against the analytic solutions :')
+  print('  n  steps    error xm     error -x2h   max error f')
+  for (nn, ns, exm, emu, ef) in check():
+    print('{:3d} {:5d}  {: 11.2e}  {: 11.2e}  {: 11.2e}'.format(nn, ns, exm, emu, ef))
+
+  print('')
+  print('Midpoint method of the book for n = 1 :')
+  print('     dr       steps    error xm')
+  for dr in (.1, .01, .001, .0001):
+    [xm, mun, ns] = midpoint(1.0, dr)
+    print('{: 9.4f} {:9d}  {: 11.2e}'.format(dr, ns, xm - pi))
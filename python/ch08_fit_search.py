@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 8 - Homogeneous Stellar Models : search for the central values
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch08_stellar_model.py takes the central temperature and density from a fit
+in mtot and the fitting value ffit at the boundary of the convective core
+from a formula in mtot, so the total mass of the model differs from the
+requested mass (10.33 Mo for mtot = 10). Here the model is shot from the
+centre : the central values of the book's fit are taken for a mass mc,
+and mc is searched so that the mass of the model equals a target (by
+default mtot), with the book's ffit for mtot.
+
+ffit cannot do this. On the branch of the book (ffit up to about 15) the
+mass changes by less than 1 %, and the only roots lie at ffit = 25 to 35,
+where the radius grows by a factor 2 to 10 and the mass zigzags from one
+trial to the next. The mass of the model grows smoothly with mc instead
+(by about 1.1 Mo per Mo), and the radius and Teff move along with it.
+
+A scan of mc brackets the root nearest to mtot times the ratio of mtot to
+the mass of the book's model; every round of the multisection then
+evaluates npar trial values inside the bracket at the same time on a pool
+of processes, which shrinks the bracket by a factor npar + 1 per round.
+Each trial integrates its own core and envelope (a few milliseconds).
+
+The surface of the book's model is found by linear extrapolation after
+steps that grow by 10 %, and the boundary of the core moves by whole
+steps, so the mass is a slightly noisy function of mc (jumps of up to 1 %).
+When a bracket turns out to hold such a jump instead of a root, the next
+bracket of the scan is tried. Brackets whose radius or log Teff depart by
+more than dlogr or dlogt (dex) from the book's model are not used. The
+search returns the best value found with the remaining mass error.
+
+Example:
+$ python ch08_fit_search.py 2 15 14
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch08_model_grid import core, envelope, model, default_ffit, SURFACE
+from multiprocessing import Pool
+import sys
+import numpy as np
+
+def trial(args):
+  """Returns the surface data (mass, radius, log L, log Teff) of the model
+  for a tuple (mtot, mc, ffit, eos)
+  """
+  (mtot, mc, ffit, eos) = args
+  return envelope(core(mtot, eos, mc), ffit)[1]
+
+def evaluate(mtot, mcs, ffit, eos='book', pool=None):
+  """Computes the surface data for an array of trial values mcs, on the
+  pool of processes when one is given. Returns an array of shape (len(mcs),
+  4).
+  """
+  tasks = [(mtot, float(mc), ffit, eos) for mc in mcs]
+  if pool is None:
+    return np.array([trial(task) for task in tasks])
+  return np.array(pool.map(trial, tasks))
+
+def multisection(fun, target, lo, hi, glo, ghi, npar, xtol, mtol, maxiter):
+  """Shrinks the bracket [lo, hi] of the mass error (glo, ghi at the ends)
+  with npar trial values per round, fun computing the mass errors of an
+  array of trial values. Returns [mc, mass error, rounds].
+  """
+  best = (lo, glo) if abs(glo) < abs(ghi) else (hi, ghi)
+  rounds = 0
+  while rounds < maxiter and hi - lo > xtol * hi and abs(best[1]) > mtol * target:
+    rounds = rounds + 1
+    pts = lo + (hi - lo) * np.arange(1, npar + 1) / (npar + 1.0)
+    gp = fun(pts)
+    xs = np.concatenate([[lo], pts, [hi]])
+    gs = np.concatenate([[glo], gp, [ghi]])
+    k = np.argmin(np.abs(gp))
+    if abs(gp[k]) < abs(best[1]):
+      best = (pts[k], gp[k])
+    j = np.flatnonzero(np.sign(gs[:-1]) != np.sign(gs[1:]))[0]
+    [lo, hi, glo, ghi] = [xs[j], xs[j + 1], gs[j], gs[j + 1]]
+  return [best[0], best[1], rounds]
+
+def search(mtot, target=None, eos='book', ffit=None, lo=.7, hi=1.2, nscan=16, npar=8,
+           xtol=1e-9, mtol=1e-6, maxiter=30, dlogr=.1, dlogt=.05, pool=None):
+  """Searches the mass mc of the central values for which the model of mass
+  mtot (fitting value ffit, by default that of the book) has the total mass
+  target (by default mtot), scanning mc from lo to hi times target. Returns
+  a dict with mc, ffit, the mass of the model, the relative mass error, the
+  number of rounds and of trial models. Raises ValueError when no crossing
+  on the branch of the book's model is found.
+  """
+  target = mtot if target is None else target
+  ffit = default_ffit(mtot) if ffit is None else ffit
+  book = trial((mtot, mtot, ffit, eos))
+  fun = lambda mcs: evaluate(mtot, mcs, ffit, eos, pool)[:, 0] - target
+
+  # scan for sign changes of the mass error on the branch of the book,
+  # nearest to the estimate from the book's model first
+  xs = np.linspace(lo * target, hi * target, nscan)
+  ys = evaluate(mtot, xs, ffit, eos, pool)
+  gs = ys[:, 0] - target
+  near = (np.abs(np.log10(ys[:, 1] / book[1])) < dlogr) & (np.abs(ys[:, 3] - book[3]) < dlogt)
+  cross = np.flatnonzero((np.sign(gs[:-1]) != np.sign(gs[1:])) & near[:-1] & near[1:])
+  if cross.size == 0:
+    raise ValueError('no central values between {0} and {1} Mo give mass {2}'.format(lo * target, hi * target, target))
+  guess = target * mtot / book[0]
+  cross = cross[np.argsort(np.abs(.5 * (xs[cross] + xs[cross + 1]) - guess))]
+
+  # a bracket may hold a jump of the mass instead of a root : then the
+  # next bracket is tried, and the best value found is kept
+  res = {'mtot': mtot, 'target': target, 'ffit': ffit, 'error': np.inf, 'rounds': 0, 'ntrial': nscan + 1}
+  for j in cross:
+    [mc, err, rounds] = multisection(fun, target, xs[j], xs[j + 1], gs[j], gs[j + 1], npar, xtol, mtol, maxiter)
+    res['rounds'] = res['rounds'] + rounds
+    res['ntrial'] = res['ntrial'] + npar * rounds
+    if abs(err) < abs(res['error']) * target:
+      res.update({'mc': mc, 'mass': target + err, 'error': err / target})
+    if abs(err) <= mtol * target:
+      break
+  return res
+
+def fit_grid(masses, eos='book', processes=None, **options):
+  """Searches mc for every mass of masses (with target = mtot), with the
+  trial models of each search spread over one pool of processes, and
+  computes the final models. Returns [results, surface, zones] : the
+  dicts of search(), an array of SURFACE records and the zone tables.
+  """
+  masses = np.atleast_1d(np.asarray(masses, dtype=float))
+  pool = Pool(processes) if processes != 1 else None
+  try:
+    results = [search(float(m), eos=eos, pool=pool, **options) for m in masses]
+  finally:
+    if pool is not None:
+      pool.close()
+      pool.join()
+  models = [model(res['mtot'], res['ffit'], eos, res['mc']) for res in results]
+  surface = np.array([mod[1] for mod in models], dtype=SURFACE)
+  return [results, surface, [mod[0] for mod in models]]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR MODEL (central values search)')
+  print('--------------------------------------------------------')
+  print('')
+  mmin = start_parameter('Smallest total mass (2 - 15) : ', 1)
+  mmax = start_parameter('Largest total mass (2 - 15)  : ', 2)
+  nm   = int(start_parameter('Number of models             : ', 3))
+  eos  = sys.argv[4] if len(sys.argv) > 4 else 'book'
+
+  masses = np.linspace(mmin, mmax, nm)
+  [results, surface, zones] = fit_grid(masses, eos)
+  print('')
+  print('           ----- book -----------   ----- fitted -------------------------')
+  print(' M(input)   mass   radius log(Teff)   mc       mass    radius log(Teff)  error   rounds trials')
+  for k in range(len(masses)):
+    book = model(masses[k], None, eos)[1]
+    res = results[k]
+    print('{: 8.3f} {: 8.4f} {: 7.3f} {: 7.4f} {: 9.5f} {: 9.5f} {: 7.3f} {: 7.4f} {: 10.2e} {:5d} {:6d}'.format(
+          masses[k], float(book['mass']), float(book['radius']), float(book['logteff']), res['mc'],
+          float(surface[k]['mass']), float(surface[k]['radius']), float(surface[k]['logteff']), res['error'],
+          res['rounds'], res['ntrial']))
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 8 - Homogeneous Stellar Models : Henyey relaxation
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch08_stellar_model.py builds a star from two polytropes. Here the four
+structure equations with the same physics (X = .7, Z = .03, gas and
+radiation pressure, electron scattering opacity kappa = .34 as implied by
+the convection test of ch08, the energy production e() of ch08)
+
+  dln r/dm = 1 / (4 pi r^3 d)
+  dln P/dm = -G m / (4 pi r^4 P)
+  dln T/dm = dln P/dm * min(grad_rad, grad_ad)
+  dL/dm    = e(d, T)
+
+are solved on a mesh in mass with Henyey's method : the differences
+between neighbouring points (trapezoidal rule) and the boundary conditions
+form a system of 4N equations, which is solved with Newton's method. The
+matrix of each Newton step is block tridiagonal with 4 x 4 blocks; block
+row k holds the equations for r and L of the interval k-1 (which fix r
+and L at point k from the inside) and those for P and T of the interval k
+(which fix P and T at point k from the outside). The inner boundary
+conditions give r and L at the first point m0 from the central density
+and energy production, the outer ones the pressure and temperature of the
+photosphere. The blocks are computed with finite differences and the
+system is solved with the block version of the Thomas algorithm.
+
+The first model starts from the polytropic model of ch08_model_grid.py;
+a sequence of masses starts every model from the previous one, with L
+rescaled to the surface luminosity of that model (5 to 7 iterations per
+model from 3 to 15 Mo). A model that does not converge from there starts
+again from the polytrope; its iterations include those of the failed start.
+The polytropic models solve the equation of state as chosen with eos (see
+ch08_model_grid.py).
+
+Example:
+$ python ch08_henyey.py 2 15 14
+$ python ch08_henyey.py 2 15 14 table
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch08_model_grid import model as polytrope_model
+from ch08_kernels import e
+import sys
+import numpy as np
+
+# constants of ch08_stellar_model.py, opacity and radiation constants
+g = 6.673e-8
+a = 7.56464e-15
+rgas = 8.314e7
+mu = .618238
+m0 = 2e33
+r0 = 6.96e10
+l0 = 3.83e33
+c = 2.99792e10
+sigma = a * c / 4.0
+kappa = 1.339944e9 * 16 * np.pi * a * c * g / 3.0
+
+# columns of the zone table and of the surface data
+ZONE = np.dtype([('q', float), ('mr', float), ('r', float), ('logp', float), ('logt', float),
+                 ('logd', float), ('logl', float), ('grad', float), ('convective', bool)])
+SURFACE = np.dtype([('mass', float), ('radius', float), ('logl', float), ('logteff', float),
+                    ('logpc', float), ('logtc', float), ('logdc', float), ('mcore', float),
+                    ('iterations', np.int32), ('error', float), ('restart', bool)])
+
+def mesh(nin=30, nmid=60, nout=70, qin=1e-6, qout=1e-12):
+  """Returns the mesh in q = m/M : geometric in q from qin to .1, uniform
+  up to .9, geometric in 1 - q down to qout, and the surface q = 1
+  """
+  inner = np.logspace(np.log10(qin), -1, nin, endpoint=False)
+  middle = np.linspace(.1, .9, nmid, endpoint=False)
+  outer = 1 - np.logspace(-1, np.log10(qout), nout)
+  return np.concatenate([inner, middle, outer, [1.0]])
+
+def state(y, m, lscale):
+  """Computes r, P, T, L, the density, beta, grad_rad and grad_ad from the
+  variables y = (ln r, ln P, ln T, L / lscale) at the masses m
+  """
+  r = np.exp(y[..., 0])
+  p = np.exp(y[..., 1])
+  t = np.exp(y[..., 2])
+  l = y[..., 3] * lscale
+  pgas = p - a * t**4 / 3.0
+  d = mu * pgas / rgas / t
+  beta = pgas / p
+  grad_rad = 1.339944e9 * p * l / m / t**4
+  grad_ad = (8 - 6 * beta) / (32 - 24 * beta - 3 * beta * beta)
+  return [r, p, t, l, d, beta, grad_rad, grad_ad]
+
+def derivatives(y, m, lscale):
+  """Computes the derivatives of the variables y with respect to m
+  """
+  [r, p, t, l, d, beta, grad_rad, grad_ad] = state(y, m, lscale)
+  dlnp = -g * m / (4 * np.pi * r**4 * p)
+  return np.stack([1 / (4 * np.pi * r**3 * d), dlnp, dlnp * np.minimum(grad_rad, grad_ad),
+                   e(d, t) / lscale], axis=-1)
+
+def boundary(y, m, mtot, lscale):
+  """Computes the residuals of the inner boundary conditions (at the mass
+  m of the first point, for r and L) or of the outer ones (at m = mtot,
+  for P and T)
+  """
+  [r, p, t, l, d, beta, grad_rad, grad_ad] = state(y, m, lscale)
+  if m < mtot:
+    return np.array([y[0] - np.log(3 * m / (4 * np.pi * d)) / 3.0, (l - e(d, t) * m) / lscale])
+
+  # photosphere : T = Teff and the Eddington approximation for the pressure,
+  # reduced by the radiative acceleration
+  gamma = kappa * l / (4 * np.pi * c * g * mtot)
+  pph = 2 / 3.0 * g * mtot / (r * r * kappa) * (1 - gamma) + a * t**4 / 3.0
+  return np.array([y[1] - np.log(pph), 4 * y[2] - np.log(l / (4 * np.pi * r * r * sigma))])
+
+# order of the difference equations in the block rows : P and T of the
+# interval k, then r and L of the interval k - 1
+OUTER = [1, 2]
+INNER = [0, 3]
+
+def residuals(y, m, lscale):
+  """Computes the residuals of all the equations as an array of shape
+  (N, 4), one block row per mesh point
+  """
+  f = derivatives(y, m, lscale)
+  dm = (m[1:] - m[:-1])[:, None]
+  diff = y[1:] - y[:-1] - .5 * dm * (f[:-1] + f[1:])
+  res = np.empty(y.shape)
+  res[0, :2] = boundary(y[0], m[0], m[-1], lscale)
+  res[1:, :2] = diff[:, INNER]
+  res[:-1, 2:] = diff[:, OUTER]
+  res[-1, 2:] = boundary(y[-1], m[-1], m[-1], lscale)
+  return res
+
+def jacobian(y, m, lscale, eps=1e-7):
+  """Computes the blocks A (left), B (diagonal) and C (right) of the
+  Jacobian of residuals() with finite differences. The differences of
+  interval k depend on the derivatives at points k and k + 1 only, so the
+  four variables are perturbed at all points at once.
+  """
+  n = len(m)
+  f = derivatives(y, m, lscale)
+  dfdy = np.empty((n, 4, 4))
+  for j in range(4):
+    hj = eps * np.maximum(np.abs(y[:, j]), 1e-6) if j == 3 else np.full(n, eps)
+    yp = y.copy()
+    yp[:, j] = yp[:, j] + hj
+    dfdy[:, :, j] = (derivatives(yp, m, lscale) - f) / hj[:, None]
+  dm = (m[1:] - m[:-1])[:, None, None]
+  eye = np.eye(4)
+  left = -eye - .5 * dm * dfdy[:-1]
+  right = eye - .5 * dm * dfdy[1:]
+
+  A = np.zeros((n, 4, 4))
+  B = np.zeros((n, 4, 4))
+  C = np.zeros((n, 4, 4))
+  A[1:, :2] = left[:, INNER]
+  B[1:, :2] = right[:, INNER]
+  B[:-1, 2:] = left[:, OUTER]
+  C[:-1, 2:] = right[:, OUTER]
+
+  # boundary conditions
+  for (k, rows) in [(0, slice(0, 2)), (n - 1, slice(2, 4))]:
+    b0 = boundary(y[k], m[k], m[-1], lscale)
+    for j in range(4):
+      hj = eps * max(abs(y[k, j]), 1e-6) if j == 3 else eps
+      yp = y[k].copy()
+      yp[j] = yp[j] + hj
+      B[k, rows, j] = (boundary(yp, m[k], m[-1], lscale) - b0) / hj
+  return [A, B, C]
+
+def solve_blocks(A, B, C, rhs):
+  """Solves the block tridiagonal system A[k] x[k-1] + B[k] x[k] +
+  C[k] x[k+1] = rhs[k] with the block Thomas algorithm
+  """
+  n = len(rhs)
+  bb = np.empty(B.shape)
+  rr = np.empty(rhs.shape)
+  bb[0] = B[0]
+  rr[0] = rhs[0]
+  for k in range(1, n):
+    mk = np.linalg.solve(bb[k - 1].T, A[k].T).T
+    bb[k] = B[k] - np.dot(mk, C[k - 1])
+    rr[k] = rhs[k] - np.dot(mk, rr[k - 1])
+  x = np.empty(rhs.shape)
+  x[-1] = np.linalg.solve(bb[-1], rr[-1])
+  for k in range(n - 2, -1, -1):
+    x[k] = np.linalg.solve(bb[k], rr[k] - np.dot(C[k], x[k + 1]))
+  return x
+
+def relax(mtot, y, q, lscale, tol=1e-9, maxiter=40, dmax=.5):
+  """Iterates the model of total mass mtot (Mo) from the variables y on
+  the mesh q with damped Newton steps (no correction larger than dmax in
+  the logarithms). Returns [y, iterations, error] where error is the size
+  of the last correction.
+  """
+  m = q * mtot * m0
+  err = np.inf
+  for it in range(1, maxiter + 1):
+    res = residuals(y, m, lscale)
+    [A, B, C] = jacobian(y, m, lscale)
+    dy = solve_blocks(A, B, C, -res)
+    err = np.max(np.abs(dy))
+    if not np.isfinite(err):
+      break
+    y = y + min(1.0, dmax / err) * dy
+    if err < tol:
+      break
+  return [y, it, err]
+
+def outer_layers(mtot, rs, lum, ts, qlast, dlnp=.02):
+  """Integrates the outer layers inward from the photosphere (radius rs,
+  luminosity lum, temperature ts) with constant L and m = mtot, with ln P
+  as independent variable, until 1 - q exceeds 1 - qlast. Returns arrays
+  ln(1 - q), ln r, ln P and ln T.
+  """
+  mtot = mtot * m0
+  gs = g * mtot / rs / rs
+  gamma = kappa * lum / (4 * np.pi * c * g * mtot)
+  pph = 2 / 3.0 * gs / kappa * (1 - gamma) + a * ts**4 / 3.0
+  [lnp, lnt, r, dm] = [np.log(pph), np.log(ts), rs, 0.0]
+  rows = []
+  while True:
+    rows.append((np.log(max(dm / mtot, 1e-300)), np.log(r), lnp, lnt))
+    if dm / mtot > 1 - qlast:
+      break
+    # one midpoint step in ln P
+    def rhs(lnp, lnt):
+      p = np.exp(lnp)
+      t = np.exp(lnt)
+      beta = 1 - a * t**4 / 3.0 / p
+      grad = min(1.339944e9 * p * lum / mtot / t**4, (8 - 6 * beta) / (32 - 24 * beta - 3 * beta * beta))
+      d = mu * beta * p / rgas / t
+      return [grad, p / (d * gs)]
+    [grad, dr] = rhs(lnp, lnt)
+    [grad, dr] = rhs(lnp + .5 * dlnp, lnt + .5 * dlnp * grad)
+    lnt = lnt + dlnp * grad
+    r = r - dlnp * dr
+    dm = dm + 4 * np.pi * r**4 / (g * mtot) * (np.exp(lnp + dlnp) - np.exp(lnp))
+    lnp = lnp + dlnp
+  return [np.array(col) for col in zip(*rows)]
+
+def initial_model(mtot, q, eos='book'):
+  """Interpolates the polytropic model of ch08_model_grid.py for mass mtot
+  (equation of state eos) on the mesh q. Returns [y, lscale]. The layers beyond the last zone are
+  integrated inward from the photosphere of the polytropic model.
+  """
+  [zones, surf] = polytrope_model(mtot, None, eos)
+  mass = float(surf['mass'])
+  qz = zones['mr'][1:] / mass
+  lnr = np.log(zones['r'][1:] * r0)
+  lnp = zones['logp'][1:] * np.log(10)
+  lnt = zones['logt'][1:] * np.log(10)
+  lum = 10**zones['logl'][1:] * l0
+  lscale = lum[-1]
+
+  # interpolation in ln(q / (1 - q)), which resolves both ends
+  y = np.empty((len(q), 4))
+  inside = q <= qz[-1]
+  sq = np.log(q[inside] / (1 - q[inside]))
+  sz = np.log(qz / (1 - qz))
+  for (j, col) in [(0, lnr), (1, lnp), (2, lnt), (3, lum / lscale)]:
+    y[inside, j] = np.interp(sq, sz, col)
+
+  # centre : r from the central density, L from the central energy
+  # production
+  dc = 10**zones['logd'][0]
+  y[:, 3] = np.where(q < qz[0], q * mtot * m0 * e(dc, 10**zones['logt'][0]) / lscale, y[:, 3])
+  y[:, 0] = np.where(q < qz[0], np.log(3 * q * mtot * m0 / (4 * np.pi * dc)) / 3.0, y[:, 0])
+
+  # outer layers
+  out = ~inside
+  [s, olnr, olnp, olnt] = outer_layers(mtot, float(surf['radius']) * r0, lscale, 10**float(surf['logteff']), qz[-1])
+  so = np.log(np.maximum(1 - q[out], 1e-300))
+  for (j, col) in [(0, olnr), (1, olnp), (2, olnt)]:
+    y[out, j] = np.interp(so, s, col)
+  y[out, 3] = 1.0
+  return [y, lscale]
+
+def results(mtot, y, q, lscale, iterations, error, restart=False):
+  """Converts the variables y into a structured array of ZONE and a record
+  of SURFACE (solar units)
+  """
+  m = q * mtot * m0
+  [r, p, t, l, d, beta, grad_rad, grad_ad] = state(y, m, lscale)
+  conv = grad_rad > grad_ad
+  zones = np.empty(len(q), dtype=ZONE)
+  zones['q'] = q
+  zones['mr'] = m / m0
+  zones['r'] = r / r0
+  zones['logp'] = np.log10(p)
+  zones['logt'] = np.log10(t)
+  zones['logd'] = np.log10(d)
+  zones['logl'] = np.log10(np.maximum(l, 1e-300) / l0)
+  zones['grad'] = np.minimum(grad_rad, grad_ad)
+  zones['convective'] = conv
+  mcore = m[np.argmin(conv)] / m0 if conv[0] else 0.0
+  surface = np.array((mtot, r[-1] / r0, np.log10(l[-1] / l0), np.log10(t[-1]), np.log10(p[0]),
+                      np.log10(t[0]), np.log10(d[0]), mcore, iterations, error, restart), dtype=SURFACE)
+  return [zones, surface]
+
+def henyey_model(mtot, start=None, q=None, eos='book', **options):
+  """Computes the model of mass mtot (Mo), starting from the variables of
+  a previous model start = (y, lscale) on the same mesh, or from the
+  polytropic model with the equation of state eos. Returns [zones, surface, (y, lscale)].
+  """
+  q = mesh() if q is None else q
+  if start is None:
+    [y, lscale] = initial_model(mtot, q, eos)
+  else:
+    # L on the scale of the surface luminosity of the previous model, so
+    # that the corrections of L weigh like those of the logarithms
+    [y, lscale] = start
+    y = y.copy()
+    y[:, 3] = y[:, 3] / y[-1, 3]
+    lscale = lscale * start[0][-1, 3]
+  [y, it, err] = relax(mtot, y, q, lscale, **options)
+  [zones, surface] = results(mtot, y, q, lscale, it, err)
+  return [zones, surface, (y, lscale)]
+
+def sequence(masses, q=None, tol=1e-9, eos='book', **options):
+  """Computes the models for a sequence of masses, each one starting from
+  the previous one (or from the polytropic model when that does not
+  converge, which sets the flag restart of its SURFACE record). The
+  iterations of a failed start are counted. Returns [surface, zones].
+  """
+  start = None
+  surfaces = []
+  zones = []
+  for mtot in masses:
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+      [z, s, new] = henyey_model(float(mtot), start, q, eos, tol=tol, **options)
+      if start is not None and not s['error'] < tol:
+        failed = int(s['iterations'])
+        [z, s, new] = henyey_model(float(mtot), None, q, eos, tol=tol, **options)
+        s['iterations'] = s['iterations'] + failed
+        s['restart'] = True
+    start = new
+    surfaces.append(s)
+    zones.append(z)
+  return [np.array(surfaces, dtype=SURFACE), zones]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR MODEL (Henyey method)')
+  print('--------------------------------------------------------')
+  print('')
+  mmin = start_parameter('First total mass (2 - 15) : ', 1)
+  mmax = start_parameter('Last total mass (2 - 15)  : ', 2)
+  nm   = int(start_parameter('Number of models          : ', 3))
+  eos  = sys.argv[4] if len(sys.argv) > 4 else 'book'
+
+  [surface, zones] = sequence(np.linspace(mmin, mmax, nm), eos=eos)
+  print('')
+  print('  Mass   radius  log(L)  log(Teff)  log(Pc)  log(Tc)  log(dc)  Mcore  iter  correction')
+  for s in surface:
+    line = '{: 6.2f} {: 7.3f} {: 7.3f} {: 8.4f} {: 8.3f} {: 8.4f} {: 8.4f} {: 6.3f} {:4d} {: 11.2e}'.format(*list(s)[:10])
+    print(line + ('  restarted from the polytrope' if s['restart'] else ''))
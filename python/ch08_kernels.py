@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 8 - Homogeneous Stellar Models : equation of state and energy kernels
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Vectorized versions of temp() and e() of ch08_stellar_model.py for arrays of
+(p, d) and (d, t).
+
+temp() of the book iterates T = mu/(R d) (p - a T^4 / 3) ten times. With
+T0 = mu p / (R d) and tau = T / T0 the equation of state becomes
+
+  tau + kappa tau^4 = 1,   kappa = a T0^4 / (3 p)
+
+which here is solved with Newton's method from an upper bound, so that the
+iteration converges monotonically and stops at a given tolerance (the fixed
+point iteration of the book even diverges when the radiation pressure is
+more than a quarter of the gas pressure).
+
+As tau depends only on kappa, temp() also has a lookup table of log(tau)
+against log(kappa) with cubic interpolation. The maximum relative error of
+the interpolation is measured when the table is built and kept with it.
+e() needs no table : once vectorized, its two exponentials cost less than
+the interpolation would.
+
+Example:
+$ python ch08_kernels.py 1000000
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from numerics import lagrange4
+from math import sqrt, log10
+import time
+import numpy as np
+
+# constants of ch08_stellar_model.py
+a = 7.56464e-15
+rgas = 8.314e7
+xx = .7
+
+# range and step of the table in log10(kappa)
+LK = (-12.0, 8.0, .01)
+
+def e(d, t):
+  """Computes the energy production for arrays of density d and
+  temperature t
+  """
+  tt = np.cbrt(np.asarray(t, dtype=float) / 1e9)
+  p1 = 1 + tt * (.133 + tt * (1.09 + tt * .938))
+  p2 = 1 + tt * (.027 + tt * (-.788 + tt * (-.149 + tt * (.261 + tt * .127))))
+  e1 = 23760.0 / (tt * tt) * p1 * np.exp(-3.38 / tt)
+  e2 = 8.6665e25 / (tt * tt) * p2 * np.exp(-15.228 / tt - tt**6 / 9.5481)
+  return d * (xx * xx * e1 + .02 * xx * e2)
+
+def temp_book(mu, p, d):
+  """Solves the equation of state with the ten fixed point iterations of
+  the book, for arrays of p and d
+  """
+  tt = mu * np.asarray(p, dtype=float) / rgas / d
+  for i in range(1, 11):
+    tt = mu / rgas / d * (p - 1 / 3.0 * a * tt**4)
+  return tt
+
+def solve_tau(kappa, tol=1e-14, maxiter=50):
+  """Solves tau + kappa tau^4 = 1 for an array of kappa >= 0 with Newton's
+  method, starting from the upper bound min(1, kappa^(-1/4))
+  """
+  kappa = np.asarray(kappa, dtype=float)
+  with np.errstate(divide='ignore'):
+    tau = np.minimum(1.0, kappa**-.25)
+  for i in range(maxiter):
+    k3 = kappa * tau**3
+    dt = (tau + k3 * tau - 1) / (1 + 4 * k3)
+    tau = tau - dt
+    if np.max(np.abs(dt) / tau, initial=0) <= tol:
+      break
+  return tau
+
+def temp(mu, p, d, tol=1e-14, maxiter=50):
+  """Solves the equation of state for arrays of pressure p and density d
+  with Newton's method (relative tolerance tol)
+  """
+  t0 = mu * np.asarray(p, dtype=float) / rgas / d
+  return t0 * solve_tau(a * t0**4 / 3.0 / p, tol, maxiter)
+
+def temp1(mu, p, d, tol=1e-14, maxiter=50):
+  """Solves the equation of state for a single state (plain floats) with
+  the same Newton iteration as temp(), without the overhead of arrays
+  """
+  t0 = mu * p / rgas / d
+  k = a * t0**4 / 3.0 / p
+  tau = 1.0 if k < 1 else 1 / sqrt(sqrt(k))
+  for i in range(maxiter):
+    k3 = k * tau**3
+    dt = (tau + k3 * tau - 1) / (1 + 4 * k3)
+    tau = tau - dt
+    if abs(dt) <= tol * tau:
+      break
+  return t0 * tau
+
+# table in memory, built on first use
+tables = {}
+
+def table():
+  """Returns the lookup table of log10(tau) against log10(kappa), with the
+  maximum relative error err_tau of the interpolation, measured between the
+  grid points
+  """
+  if 'k' not in tables:
+    lk = np.arange(LK[0], LK[1] + .5 * LK[2], LK[2])
+    tab = {'ltau': np.log10(solve_tau(10**lk))}
+
+    # the interpolation error is largest between the grid points
+    sk = lk[:-1] + np.linspace(.05, .95, 19)[:, None] * LK[2]
+    tab['err_tau'] = np.max(np.abs(10**(lagrange4(sk, lk[0], LK[2], tab['ltau']) - np.log10(solve_tau(10**sk))) - 1))
+    # plain list for the lookups of single states
+    tab['ltau1'] = tab['ltau'].tolist()
+    tables['k'] = tab
+  return tables['k']
+
+def temp_table(mu, p, d):
+  """Computes the temperature for arrays of p and d from the lookup table.
+  Outside the table, tau = 1 - kappa for small kappa and Newton's method
+  for large kappa.
+  """
+  tab = table()
+  t0 = mu * np.asarray(p, dtype=float) / rgas / d
+  kappa = a * t0**4 / 3.0 / p
+  with np.errstate(divide='ignore'):
+    tau = 10**lagrange4(np.log10(kappa), LK[0], LK[2], tab['ltau'])
+  low = kappa < 10**LK[0]
+  tau = np.where(low, 1 - kappa, tau)
+  high = np.isnan(tau) & ~low
+  if np.any(high):
+    tau[high] = solve_tau(kappa[high])
+  return t0 * tau
+
+def temp_table1(mu, p, d):
+  """Computes the temperature for a single state (plain floats) from the
+  lookup table, as temp_table() without the overhead of arrays
+  """
+  ltau = table()['ltau1']
+  t0 = mu * p / rgas / d
+  kappa = a * t0**4 / 3.0 / p
+  if kappa < 10**LK[0]:
+    return t0 * (1 - kappa)
+  s = (log10(kappa) - LK[0]) / LK[2]
+  if s > len(ltau) - 1:
+    return temp1(mu, p, d)
+  i = min(int(s) - 1, len(ltau) - 4) if s >= 1 else 0
+  t = s - i
+  lt = (-(t - 1) * (t - 2) * (t - 3) / 6.0 * ltau[i] + t * (t - 2) * (t - 3) / 2.0 * ltau[i + 1]
+        - t * (t - 1) * (t - 3) / 2.0 * ltau[i + 2] + t * (t - 1) * (t - 2) / 6.0 * ltau[i + 3])
+  return t0 * 10**lt
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR MODEL (kernels)')
+  print('--------------------------------------------------------')
+  print('')
+  npts = int(start_parameter('Number of test points : ', 1))
+
+  # random states like those in the models of 2 - 15 Mo : the ratio beta
+  # of gas to total pressure stays above .82 (the book's iteration needs
+  # beta > .8)
+  from ch08_model_grid import temp as temp_scalar, e as e_scalar
+  mu = .618238
+  rng = np.random.RandomState(1)
+  t = 10**rng.uniform(5.0, 7.6, npts)
+  beta = rng.uniform(.82, 1.0, npts)
+  p = a * t**4 / 3.0 / (1 - beta)
+  d = beta * p * mu / rgas / t
+
+  tab = table()
+  print('')
+  print('table error bound : {: .2e}'.format(tab['err_tau']))
+  print('')
+  print('kernel                 us/point   max rel. error')
+
+  # the scalar functions of the grid runner, on a part of the points
+  ns = min(npts, 20000)
+  t1 = time.time()
+  res = np.array([temp_scalar(mu, p[k], d[k]) for k in range(ns)])
+  tscalar = (time.time() - t1) / ns * 1e6
+  exact = temp(mu, p, d)
+  print('{:22s} {: 9.4f}   {: .2e}'.format('temp (book, scalar)', tscalar, np.max(np.abs(res / exact[:ns] - 1))))
+  for (name, func) in [('temp (book)', temp_book), ('temp (Newton)', temp), ('temp (table)', temp_table)]:
+    t1 = time.time()
+    res = func(mu, p, d)
+    print('{:22s} {: 9.4f}   {: .2e}'.format(name, (time.time() - t1) / npts * 1e6, np.max(np.abs(res / exact - 1))))
+
+  t1 = time.time()
+  res = np.array([e_scalar(d[k], t[k]) for k in range(ns)])
+  tscalar = (time.time() - t1) / ns * 1e6
+  print('{:22s} {: 9.4f}   {: .2e}'.format('e (book, scalar)', tscalar, np.max(np.abs(res / e(d[:ns], t[:ns]) - 1))))
+  t1 = time.time()
+  res = e(d, t)
+  print('{:22s} {: 9.4f}   {: .2e}'.format('e', (time.time() - t1) / npts * 1e6, 0.0))
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 8 - Homogeneous Stellar Models : grid of models
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Builds the models of ch08_stellar_model.py without prompts, for a whole
+grid of masses on a pool of processes. The model is split in two parts :
+core() integrates the convective polytrope from the centre up to the
+boundary of the convective core, envelope() continues with the radiative
+n = 3 polytrope from that boundary to the surface for a given fitting
+value ffit (by default the formula of the book). The zones of each model
+are returned as a structured array with the columns of the table of
+ch08_stellar_model.py, the surface data as a record of SURFACE.
+
+The equation of state is by default solved as in the book (eos = 'book'),
+with Newton's method of ch08_kernels.py to full precision (eos =
+'newton'), which is also faster than the ten iterations of the book, or
+from the lookup table of ch08_kernels.py (eos = 'table', the fastest).
+
+Example:
+$ python ch08_model_grid.py 2 15 27
+$ python ch08_model_grid.py 2 15 27 newton models.npz
+$ python ch08_model_grid.py 2 15 27 table
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from multiprocessing import Pool
+from math import exp, sqrt, log, pow, log10, pi
+import sys
+import numpy as np
+import ch08_kernels
+
+# constants of ch08_stellar_model.py
+g = 6.673e-8
+a = 7.56464e-15
+rgas = 8.314e7
+xx = .7
+yy = .27
+zz = .03
+mu = .618238
+m0 = 2e33
+r0 = 6.96e10
+l0 = 3.83e33
+
+# columns of the zone table (zone = 1 convective, 2 radiative) and of the
+# surface data
+ZONE = np.dtype([('i', np.int32), ('zone', np.int8), ('mr', float), ('logp', float), ('logt', float),
+                 ('logd', float), ('r', float), ('loge', float), ('logl', float),
+                 ('x', float), ('f', float), ('h', float)])
+SURFACE = np.dtype([('mtot', float), ('ffit', float), ('mcore', float), ('mass', float),
+                    ('radius', float), ('logl', float), ('logteff', float), ('nzone', np.int32)])
+
+def e(d, t):
+  """Computes the energy production for given density d and temperature t
+  """
+  tt = exp(1 / 3.0 * log(t / 1e9))
+  p1 = 1 + tt * (.133 + tt * (1.09 + tt * .938))
+  p2 = 1 + tt * (.027 + tt * (-.788 + tt * (-.149 + tt * (.261 + tt * .127))))
+  e1 = 23760.0 / pow(tt, 2) * p1 * exp(-3.38 / tt)
+  e2 = 8.6665e25 / pow(tt, 2) * p2 * exp(-15.228 / tt - pow(tt, 6) / 9.5481)
+  return d * (pow(xx, 2) * e1 + .02 * xx * e2)
+
+def temp(mu, p, d):
+  """Solves the equation of state to compute the temperature from the
+  pressure, density and mean molecular weight
+  """
+  tt = mu * p / rgas / d
+  for i in range(1, 11):
+    tt = mu / rgas / d * (p - 1 / 3.0 * a * pow(tt, 4))
+  return tt
+
+# temperature and energy production functions for each choice of eos
+EOS = {'book': (temp, e), 'newton': (ch08_kernels.temp1, e), 'table': (ch08_kernels.temp_table1, e)}
+
+def default_ffit(mtot):
+  """Returns the fitting value ffit of the book for total mass mtot
+  """
+  w = log10(mtot)
+  if mtot < 4:
+    return 9.0
+  if mtot < 10:
+    return 19.58794 - 17.58794 * w
+  return 2.0
+
+def core(mtot, eos='book', mc=None):
+  """Integrates the convective core of the model for mass mtot up to the
+  boundary where the radiative gradient drops below the adiabatic one. The
+  central values are those of the book's fit for mass mc (by default mtot).
+  Returns the state at the boundary as a dict (p, d, t, m, r, l in cgs,
+  the zone counter i) with the rows of the zone table in 'rows'.
+  """
+  (temp, e) = EOS[eos]
+  w = log10(mtot if mc is None else mc)
+
+  # central values of temperature and density
+  tc = pow(10, 7.23937 + .2724354 * w - .0401771 * w * w)
+  dc = pow(10, 2.27899 - 1.658707 * w + .29329095 * w * w)
+
+  # compute other central quantities
+  pgc = rgas * dc * tc / mu
+  prc = 1 / 3.0 * a * pow(tc, 4)
+  ptc = pgc + prc
+  betac = pgc / ptc
+  beta = 1 - 2 / 3.0 * (1 - betac)
+  fb = (8 - 6 * beta) / (32 - 24 * beta - 3 * pow(beta, 2))
+  n = (1 - fb) / fb
+  rn = sqrt((n + 1) * ptc / 4.0 / pi / g / dc / dc)
+  eec = e(dc, tc)
+  rows = [(0, 1, 0.0, log10(ptc), log10(tc), log10(dc), 0.0, log10(eec), 0.0, 0.0, 1.0, 0.0)]
+
+  # first step from the series expansion
+  dx = .1
+  x = dx
+  f = 1 - 1 / 6.0 * pow(dx, 2) + n / 120.0 * pow(dx, 4)
+  h = -1 / 3.0 * dx + n / 30.0 * pow(dx, 3)
+  p = ptc * pow(f, n + 1)
+  d = dc * pow(f, n)
+  m = -4 * pi * dc * pow(rn, 3) * pow(x, 2) * h
+  r = rn * x
+  t = temp(mu, p, d)
+  l = 4 / 3.0 * pi * dc * eec * pow(dx * rn, 3)
+  rows.append((1, 1, m / m0, log10(p), log10(t), log10(d), r / r0, log10(e(d, t)), log10(l / l0), x, f, h))
+
+  # midpoint steps until the convective criterion fails
+  i = 2
+  while True:
+    x12 = x + .5 * dx
+    f12 = f + .5 * dx * h
+    if f12 <= 0:
+      raise ValueError('surface reached inside the convective core (mtot = {0})'.format(mtot))
+    h12 = h + .5 * dx * (-pow(f, n) - 2 * h / x)
+    d12 = dc * pow(f12, n)
+    t12 = temp(mu, ptc * pow(f12, n + 1), d12)
+    ee12 = e(d12, t12)
+    x = x + dx
+    f = f + dx * h12
+    if f <= 0:
+      raise ValueError('surface reached inside the convective core (mtot = {0})'.format(mtot))
+    h = h + dx * (-pow(f12, n) - 2 * h12 / x12)
+    p = ptc * pow(f, n + 1)
+    d = dc * pow(f, n)
+    m = -4 * pi * dc * pow(rn, 3) * pow(x, 2) * h
+    r = rn * x
+    t = temp(mu, p, d)
+    l = l + 4 * pi * d12 * dx * ee12 * pow(rn, 3) * pow(x12, 2)
+    rows.append((i, 1, m / m0, log10(p), log10(t), log10(d), r / r0, log10(e(d, t)), log10(l / l0), x, f, h))
+    i = i + 1
+
+    # check if boundary of convective zone is reached
+    test = 1.339944e9 * p / m * l / pow(t, 4) / fb
+    if test < 1:
+      break
+  return {'mtot': mtot, 'eos': eos, 'p': p, 'd': d, 't': t, 'm': m, 'r': r, 'l': l, 'i': i, 'rows': rows}
+
+def envelope(state, ffit):
+  """Integrates the radiative envelope from the boundary state returned
+  by core() for the fitting value ffit. Returns [rows, surface] with the
+  rows of the envelope and the surface data (mass, radius, log L and log
+  Teff in solar units).
+  """
+  [p, d, m, r, l, i] = [state[k] for k in ('p', 'd', 'm', 'r', 'l', 'i')]
+  temp = EOS[state['eos']][0]
+
+  # compute fitting parameters
+  f = ffit
+  ptc = p / pow(ffit, 4)
+  dc = d / pow(ffit, 3)
+  rn = sqrt(ptc / pi / g / pow(dc, 2))
+  x = r / rn
+  h = -m / 4.0 / pi / dc / pow(rn, 3) / pow(x, 2)
+  n = 3.0
+  dx = .04
+  rows = []
+  logl = log10(l / l0)
+
+  while True:
+    flast = f
+    x12 = x + .5 * dx
+    f12 = f + .5 * dx * h
+    if f12 <= 0:
+      break
+    h12 = h + .5 * dx * (-pow(f, n) - 2 * h / x)
+    x = x + dx
+    f = f + dx * h12
+    if f <= 0:
+      break
+    h = h + dx * (-pow(f12, n) - 2 * h12 / x12)
+    p = ptc * pow(f, n + 1)
+    d = dc * pow(f, n)
+    m = -4 * pi * dc * pow(rn, 3) * pow(x, 2) * h
+    r = rn * x
+    t = temp(mu, p, d)
+    rows.append((i, 2, m / m0, log10(p), log10(t), log10(d), r / r0, 0.0, logl, x, f, h))
+    i = i + 1
+    dx = 1.1 * dx
+
+  # compute exact location of surface and surface data
+  xs = x - flast / h
+  mt = m + .5 * pi * d * pow(rn, 3) * pow(x + xs, 2)
+  rad = r + rn * (xs - x)
+  logteff = 3.7613 + .25 * logl - .5 * log10(rad / r0)
+  return [rows, (mt / m0, rad / r0, logl, logteff)]
+
+def model(mtot, ffit=None, eos='book', mc=None):
+  """Computes the model for mass mtot with the fitting value ffit (by
+  default that of the book), the equation of state eos and the central
+  values of mass mc (by default mtot). Returns [zones, surface] as a
+  structured array of ZONE and a record of SURFACE.
+  """
+  if ffit is None:
+    ffit = default_ffit(mtot)
+  state = core(mtot, eos, mc)
+  [rows, (mass, radius, logl, logteff)] = envelope(state, ffit)
+  zones = np.array(state['rows'] + rows, dtype=ZONE)
+  surface = np.array((mtot, ffit, state['m'] / m0, mass, radius, logl, logteff, len(zones)), dtype=SURFACE)
+  return [zones, surface]
+
+def model_task(args):
+  """Worker function of the pool : model() for a tuple (mtot, ffit, eos)
+  """
+  return model(*args)
+
+def grid(masses, ffit=None, eos='book', processes=None, chunksize=4):
+  """Computes the models for all masses on a pool of processes. ffit is
+  None (the book's formula), a number or a sequence with one value per
+  mass. Returns [surface, zones] : an array of SURFACE records and the list
+  of zone tables.
+  """
+  masses = np.atleast_1d(np.asarray(masses, dtype=float))
+  ffits = [None] * masses.size if ffit is None else np.broadcast_to(np.asarray(ffit, dtype=float), masses.shape)
+  tasks = [(float(masses[k]), None if ffits[k] is None else float(ffits[k]), eos) for k in range(masses.size)]
+  if processes == 1:
+    results = [model_task(task) for task in tasks]
+  else:
+    pool = Pool(processes)
+    try:
+      results = pool.map(model_task, tasks, chunksize)
+    finally:
+      pool.close()
+      pool.join()
+  surface = np.array([res[1] for res in results], dtype=SURFACE)
+  return [surface, [res[0] for res in results]]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR MODEL (grid)')
+  print('--------------------------------------------------------')
+  print('')
+  mmin = start_parameter('Smallest total mass (2 - 15) : ', 1)
+  mmax = start_parameter('Largest total mass (2 - 15)  : ', 2)
+  nm   = int(start_parameter('Number of models             : ', 3))
+
+  eos  = sys.argv[4] if len(sys.argv) > 4 else 'book'
+
+  [surface, zones] = grid(np.linspace(mmin, mmax, nm), eos=eos)
+  print('')
+  print(' M(input)   ffit    Mcore   Mass    radius   log(L)  log(Teff) zones')
+  for s in surface:
+    print('{: 8.3f} {: 7.3f} {: 7.3f} {: 7.3f} {: 7.3f} {: 8.3f} {: 8.4f} {:5d}'.format(*s))
+  if len(sys.argv) > 5:
+    np.savez(sys.argv[5], surface=surface, zones=np.concatenate(zones), start=np.cumsum([0] + [len(z) for z in zones])[:-1])
+    print('Models saved in ' + sys.argv[5])
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 9 - Stellar Atmospheres : grid of models
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Computes the gray atmospheres of ch09_stellar_atmosphere.py for a whole grid
+of effective temperatures, surface gravities and mean molecular weights.
+temp(), dens(), absorp(), geffect() and stap() work on arrays, so all the
+models are advanced together, one layer at a time, with the same optical
+depth steps as the book (.001 for the first layer, then .25 tau).
+
+The result is a structured array of shape (len(teffs), len(loggs),
+len(mus)) with one record per model : teff, logg, mu and, for the 33
+layers, tau, T, Pg, Pr, rho, kappa and z (in cm). It is saved as one .npy
+file that load_cube() maps into memory, so a program that needs only a
+few models does not read the whole cube.
+
+Example:
+$ python ch09_atmosphere_grid.py 5000 30000 26 3 5 11 .6 1.3 8 atmospheres.npy
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+
+# some physical constants used in the program :
+g = 6.673e-8
+a = 7.56464e-15
+r = 8.314e7
+
+NLAYER = 33
+COLUMNS = ['tau', 't', 'pg', 'pr', 'rho', 'kappa', 'z']
+
+def model_dtype(nlayer=NLAYER):
+  """Returns the structured type of one model with nlayer layers
+  """
+  return np.dtype([('teff', float), ('logg', float), ('mu', float)] +
+                  [(name, float, (nlayer,)) for name in COLUMNS])
+
+def absorp(t, d):
+  """Computes the absorption coefficient for arrays of temperature T and
+  density d
+  """
+  return 1.984e24 * d / t**3.5
+
+def dens(t, p, mu):
+  """Computes the density for arrays of temperature T, pressure P and mu
+  """
+  return p * mu / t / r
+
+def geffect(gs, teff, k, tau):
+  """Computes the effective gravitational acceleration
+  """
+  return gs - k * a * teff**4 / 4.0 * (1 + .459 * np.exp(-3.4488 * tau))
+
+def radpress(t):
+  """Computes the radiation pressure for temperature T
+  """
+  return a / 3.0 * t**4
+
+def temp(tau, teff):
+  """Computes the temperature for optical depth tau and effective
+  temperature teff
+  """
+  q = .7104 - .1331 * np.exp(-3.4488 * tau)
+  return teff * (.75 * (tau + q))**.25
+
+def stap(teff, gs, mu, dtau, tau, pg, kk, ge):
+  """Computes the quantities of layer i+1 from those of layer i (tau, pg,
+  kk, ge). Returns [tau, t, pg, d, kk, ge, kk1, d1] with kk1 and d1 at
+  the half step.
+  """
+  tau1 = tau + .5 * dtau
+  t1 = temp(tau1, teff)
+  pg1 = pg + .5 * dtau * ge / kk
+  d1 = dens(t1, pg1, mu)
+  kk1 = absorp(t1, d1)
+  ge1 = geffect(gs, teff, kk1, tau1)
+  tau = tau + dtau
+  t = temp(tau, teff)
+  pg = pg + dtau * ge1 / kk1
+  d = dens(t, pg, mu)
+  kk = absorp(t, d)
+  ge = geffect(gs, teff, kk, tau)
+  return [tau, t, pg, d, kk, ge, kk1, d1]
+
+def atmosphere_grid(teffs, loggs, mus, nlayer=NLAYER):
+  """Computes the atmospheres for all combinations of teffs, loggs and mus.
+  Returns a structured array of model_dtype(nlayer) with shape
+  (len(teffs), len(loggs), len(mus)).
+  """
+  [teff, logg, mu] = np.meshgrid(np.atleast_1d(np.asarray(teffs, dtype=float)),
+                                 np.atleast_1d(np.asarray(loggs, dtype=float)),
+                                 np.atleast_1d(np.asarray(mus, dtype=float)), indexing='ij')
+  gs = 10**logg
+  cube = np.zeros(teff.shape, dtype=model_dtype(nlayer))
+  cube['teff'] = teff
+  cube['logg'] = logg
+  cube['mu'] = mu
+
+  def store(i, tau, t, pg, d, kk, z):
+    for (name, val) in zip(COLUMNS, [tau, t, pg, radpress(t), d, kk, z]):
+      cube[name][..., i] = val
+
+  # values at the top of the atmosphere
+  tau = np.zeros(teff.shape)
+  d = np.full(teff.shape, 1e-13)
+  t = temp(tau, teff)
+  pg = r * d * t / mu
+  kk = absorp(t, d)
+  ge = geffect(gs, teff, kk, tau)
+  z = np.zeros(teff.shape)
+  store(0, tau, t, pg, d, kk, z)
+
+  # first layer, then steps of .25 tau
+  dtau = .001
+  for i in range(1, nlayer):
+    [tau, t, pg, d, kk, ge, kk1, d1] = stap(teff, gs, mu, dtau, tau, pg, kk, ge)
+    z = z + dtau / kk1 / d1
+    store(i, tau, t, pg, d, kk, z)
+    dtau = .25 * tau
+  return cube
+
+def save_cube(path, cube):
+  """Saves the cube as a .npy file
+  """
+  np.save(path, cube)
+
+def load_cube(path):
+  """Maps the cube saved in path into memory (read only)
+  """
+  return np.load(path, mmap_mode='r')
+
+def axes(cube):
+  """Returns the grid axes [teffs, loggs, mus] of a cube
+  """
+  return [np.array(cube['teff'][:, 0, 0]), np.array(cube['logg'][0, :, 0]), np.array(cube['mu'][0, 0, :])]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR ATMOSPHERE (grid)')
+  print('--------------------------------------------------------')
+  print('')
+  tmin = start_parameter('Effective temperature from        : ', 1)
+  tmax = start_parameter('Effective temperature to          : ', 2)
+  nt   = int(start_parameter('Number of temperatures            : ', 3))
+  gmin = start_parameter('Surface gravit.accel.(log10) from : ', 4)
+  gmax = start_parameter('Surface gravit.accel.(log10) to   : ', 5)
+  ng   = int(start_parameter('Number of gravities               : ', 6))
+  mmin = start_parameter('Mean molecular weight from        : ', 7)
+  mmax = start_parameter('Mean molecular weight to          : ', 8)
+  nmu  = int(start_parameter('Number of molecular weights       : ', 9))
+
+  cube = atmosphere_grid(np.linspace(tmin, tmax, nt), np.linspace(gmin, gmax, ng), np.linspace(mmin, mmax, nmu))
+  bad = ~np.all(np.isfinite(cube['pg']) & (cube['pg'] > 0), axis=-1)
+  print('')
+  print('Models computed              : {:d}'.format(cube.size))
+  print('Models with a negative Pg    : {:d}'.format(int(np.sum(bad))))
+  print('Size of the cube (bytes)     : {:d}'.format(cube.nbytes))
+  if len(sys.argv) > 10:
+    save_cube(sys.argv[10], cube)
+    print('Cube saved in ' + sys.argv[10])
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 9 - Stellar Atmospheres : adaptive steps and streaming output
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch09_stellar_atmosphere.py takes dtau = .001 for the first layer and then
+dtau = .25 tau, which ends near tau = 1 after 32 layers and is coarse in the
+deeper layers. Here the step in tau is controlled by an error estimate :
+stap() already computes the Euler step to the middle of the layer, and the
+difference between the Euler and the midpoint increments of Pg over the
+full layer estimates the error of the step. Steps with a relative error
+larger than tol are repeated with a smaller dtau; the others set the next
+dtau. The integration stops exactly at any target optical depth.
+
+Near the top Pg climbs from the arbitrary starting density on a scale of
+about 1e-8 in tau, so the steps that keep the error below tol start near
+1e-10 and would give some 1500 layers (tol = 1e-5) above tau = .001. As
+in the book the first layer lies at tau = .001 : the steps up to it are
+still controlled by tol but are not layers of their own, and the layers
+below go on with the step that the control reached there (8e-6 for
+tol = 1e-5). This gives 779 layers instead of 2186 down to tau = 1.
+
+layers() is a generator that yields one layer at a time, and write_layers()
+collects them in a small buffer that is written to a CSV or a binary file
+when it is full, so the memory use does not depend on the number of layers.
+A binary file holds records of LAYER and can be read with
+np.fromfile(path, dtype=LAYER) or mapped with np.memmap.
+
+Example:
+$ python ch09_atmosphere_stream.py 10000 4 1.048 100 1e-5 layers.csv
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from ch09_atmosphere_grid import temp, absorp, geffect, radpress, stap, r
+import sys
+import numpy as np
+
+LAYER = np.dtype([('i', np.int64), ('tau', float), ('t', float), ('pg', float), ('pr', float),
+                  ('rho', float), ('kappa', float), ('ge', float), ('z', float)])
+
+def layers(teff, logg, mu, taumax=1.0, tol=1e-4, dtau=.001, maxlayer=10**7):
+  """Generator that integrates the atmosphere from tau = 0 to taumax and
+  yields the layers as tuples (i, tau, t, pg, pr, rho, kappa, ge, z) in
+  the order of LAYER. The first layer lies at tau = dtau; all steps keep
+  the relative error estimate of Pg below tol.
+  """
+  gs = 10**logg
+
+  # values at the top of the atmosphere
+  tau = 0.0
+  d = 1e-13
+  t = float(temp(tau, teff))
+  pg = r * d * t / mu
+  kk = float(absorp(t, d))
+  ge = float(geffect(gs, teff, kk, tau))
+  z = 0.0
+  i = 0
+  yield (i, tau, t, pg, radpress(t), d, kk, ge, z)
+
+  # h is the trial step, the first layer lies at tau = dtau
+  h = dtau
+  while tau < taumax and i < maxlayer:
+    stop = min(dtau, taumax) if i == 0 else taumax
+    last = h >= stop - tau
+    step = stop - tau if last else h
+    [tau1, t1, pg1, d1, kk1, ge1, kkh, dh] = [float(v) for v in stap(teff, gs, mu, step, tau, pg, kk, ge)]
+
+    # midpoint minus Euler increment of Pg
+    err = abs(pg1 - pg - step * ge / kk) / abs(pg1)
+    if not err <= tol and step > 1e-12 * max(tau, 1e-3):
+      h = step * max(.2, .9 * np.sqrt(tol / err)) if np.isfinite(err) else .2 * step
+      continue
+    z = z + step / kkh / dh
+    [tau, t, pg, d, kk, ge] = [tau1, t1, pg1, d1, kk1, ge1]
+    h = step * (4.0 if err == 0 else min(4.0, max(.2, .9 * np.sqrt(tol / err))))
+    if i > 0 or last:
+      i = i + 1
+      yield (i, tau, t, pg, radpress(t), d, kk, ge, z)
+
+def book_layers(teff, logg, mu, nlayer=33):
+  """Generator with the fixed steps of the book (.001, then .25 tau)
+  """
+  gs = 10**logg
+  tau = 0.0
+  d = 1e-13
+  t = float(temp(tau, teff))
+  pg = r * d * t / mu
+  kk = float(absorp(t, d))
+  ge = float(geffect(gs, teff, kk, tau))
+  z = 0.0
+  yield (0, tau, t, pg, radpress(t), d, kk, ge, z)
+  dtau = .001
+  for i in range(1, nlayer):
+    [tau, t, pg, d, kk, ge, kkh, dh] = [float(v) for v in stap(teff, gs, mu, dtau, tau, pg, kk, ge)]
+    z = z + dtau / kkh / dh
+    yield (i, tau, t, pg, radpress(t), d, kk, ge, z)
+    dtau = .25 * tau
+
+def write_layers(gen, f, binary=False, buffer=4096):
+  """Writes the layers of the generator gen to the open file f (opened in
+  binary mode for binary = True), buffer layers at a time. CSV files
+  start with a header line. Returns the last layer as a record of LAYER.
+  """
+  block = np.empty(buffer, dtype=LAYER)
+  n = 0
+  last = None
+  if not binary:
+    f.write(','.join(LAYER.names) + '\n')
+
+  def flush(rows):
+    if binary:
+      rows.tofile(f)
+    else:
+      np.savetxt(f, rows, delimiter=',', fmt=['%d'] + ['%.10e'] * (len(LAYER.names) - 1))
+
+  for layer in gen:
+    block[n] = layer
+    n = n + 1
+    if n == buffer:
+      flush(block)
+      last = block[-1].copy()
+      n = 0
+  if n > 0:
+    flush(block[:n])
+    last = block[n - 1].copy()
+  return last
+
+def disp(layer):
+  """Displays one layer as in ch09_stellar_atmosphere.py
+  """
+  (i, tau, t, pg, pr, rho, kk, ge, z) = layer
+  print('{: 6d} {: 10.5f} {: 8.1f} {: 11.2f} {: 9.2f} {: 9.3f} {: 9.5f} {: 9.2f} {: 9.1f}'.format(i, tau, t, pg, pr, rho * 1e11, kk, ge, z / 100000.0))
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : STELLAR ATMOSPHERE (adaptive steps)')
+  print('--------------------------------------------------------')
+  print('')
+  teff   = start_parameter('Effective temperature         : ', 1)
+  logg   = start_parameter('Surface gravit.accel.(log10)  : ', 2)
+  mu     = start_parameter('Average mean molecular weight : ', 3)
+  taumax = start_parameter('Final optical depth           : ', 4)
+  tol    = start_parameter('Relative tolerance            : ', 5)
+
+  print('')
+  if len(sys.argv) > 6:
+    path = sys.argv[6]
+    binary = not path.endswith('.csv')
+    with open(path, 'wb' if binary else 'w') as f:
+      last = write_layers(layers(teff, logg, mu, taumax, tol), f, binary)
+    print('Layers written to ' + path)
+  else:
+    print('     i      tau        T          Pg         Pr         d        k        ge       z(km)')
+    for layer in layers(teff, logg, mu, taumax, tol):
+      disp(layer)
+    last = np.array(layer, dtype=LAYER)
+  print('')
+  print('layers : {:d}   tau : {:.5f}   T : {:.1f}   Pg : {:.6e}   z : {:.3f} km'.format(
+        int(last['i']), float(last['tau']), float(last['t']), float(last['pg']), float(last['z']) / 1e5))
+
+  # accuracy of the book's steps at its last layer
+  for book in book_layers(teff, logg, mu):
+    pass
+  for ref in layers(teff, logg, mu, book[1], 1e-9):
+    pass
+  print('book steps : Pg at tau = {:.5f} off by {: .2e} (relative)'.format(book[1], book[3] / ref[3] - 1))
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 10 - The Structure of White Dwarfs : table of the equation of state
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+density() of ch10_white_dwarf.py inverts the pressure of the degenerate
+electrons P = a f(x) with Newton's method, twice per step. Here the inverse
+is tabulated once : y = ln x on a uniform grid in s = ln(P / a), together
+with its exact derivative dy/ds = f / (x f'), so a cubic Hermite
+interpolation gives x to about 2e-14 relative. The table is stored in the
+cache directory (see numerics.py) and kept in memory.
+
+Outside the table the limits take over : for small x the series
+f = x^5 (8/5 - 4/7 x^2 + ...) and for large x f = 2 x^4 - 2 x^2 +
+3 ln(2x) - 7/4 + O(1/x^2), both solved for x by a few fixed point
+iterations. xofp() works on arrays of pressures and can polish the result
+with one Newton step; xofp1() is the same lookup for one pressure without
+numpy, for the integration of a single model.
+
+Example:
+$ python ch10_eos_table.py 1e20 1e25 1e30
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+from numerics import cached_table
+from math import log, exp
+import sys
+import numpy as np
+
+# constants of ch10_white_dwarf.py
+a = 6.01e22
+b = 1964000.0
+
+# grid of the table in s = ln(P / a) : x from about 1e-3 to 1e3
+SMIN = -34.0
+SMAX = 28.0
+DS = .01
+
+# f(x) = 8 * integral of t^4 / sqrt(1 + t^2) from 0 to x = x^5 * sum of
+# SERIES[k] * x^(2k) for small x
+SERIES = []
+c = 1.0
+for k in range(24):
+  SERIES.append(8 * c / (2 * k + 5))
+  c = -c * (2 * k + 1) / (2 * k + 2.0)
+
+def f(x):
+  """Evaluates f(x) for an array x (series below x = .3)
+  """
+  x = np.asarray(x, dtype=float)
+  res = np.array(x * (2 * x * x - 3) * np.sqrt(1 + x * x) + 3 * np.arcsinh(x))
+  small = x < .3
+  if np.any(small):
+    xs = x[small]
+    x2 = xs * xs
+    s = np.zeros(xs.shape)
+    for ck in reversed(SERIES):
+      s = s * x2 + ck
+    res[small] = s * xs**5
+  return res
+
+def dfdx(x):
+  """Evaluates the derivative of f(x) for an array x
+  """
+  return 8 * x**4 / np.sqrt(1 + x * x)
+
+def x_small(k, niter=4):
+  """Solves f(x) = k for small x with the series
+  """
+  x = (k / SERIES[0])**.2
+  for i in range(niter):
+    x2 = x * x
+    s = 0.0 * x
+    for ck in reversed(SERIES):
+      s = s * x2 + ck
+    x = (k / s)**.2
+  return x
+
+def x_large(k, niter=4):
+  """Solves f(x) = k for large x with the asymptotic expansion
+  """
+  x = (.5 * k)**.25
+  for i in range(niter):
+    x = (.5 * (k + 2 * x * x - 3 * np.log(2 * x) + 1.75))**.25
+  return x
+
+def newton(x, k, niter=1):
+  """Polishes the solution x of f(x) = k with niter Newton steps
+  """
+  for i in range(niter):
+    x = x - (f(x) - k) / dfdx(x)
+  return x
+
+def build():
+  """Computes ln x and its derivative on the grid SMIN ... SMAX
+  """
+  s = np.linspace(SMIN, SMAX, int(round((SMAX - SMIN) / DS)) + 1)
+  k = np.exp(s)
+  x = np.where(s < 0, x_small(np.minimum(k, 1.0)), x_large(np.maximum(k, 1.0)))
+  x = newton(x, k, 40)
+  return {'s': s, 'y': np.log(x), 'dy': f(x) / x / dfdx(x)}
+
+# table in memory, loaded from the cache directory on first use
+tables = {}
+
+def table():
+  """Returns the table (a dict of arrays s, y = ln x and dy = dy/ds)
+  """
+  if 'eos' not in tables:
+    tab = cached_table('wd_eos_{0:g}_{1:g}_{2:g}.npz'.format(SMIN, SMAX, DS), build)
+    tab['ylist'] = tab['y'].tolist()
+    tab['dylist'] = tab['dy'].tolist()
+    tables['eos'] = tab
+  return tables['eos']
+
+def xofp(p, polish=False):
+  """Returns x for an array of pressures p (P = a f(x)), from the table
+  or the limits outside it, optionally polished with one Newton step
+  """
+  tab = table()
+  k = np.asarray(p, dtype=float) / a
+  s = np.log(k)
+  u = np.clip((s - SMIN) / DS, 0, len(tab['s']) - 1.000001)
+  i = u.astype(int)
+  t = u - i
+
+  # cubic Hermite interpolation between the grid points i and i + 1
+  y = ((1 + 2 * t) * (1 - t)**2 * tab['y'][i] + t * (1 - t)**2 * DS * tab['dy'][i] +
+       t * t * (3 - 2 * t) * tab['y'][i + 1] + t * t * (t - 1) * DS * tab['dy'][i + 1])
+  x = np.exp(y)
+  if np.any(s < SMIN):
+    x = np.where(s < SMIN, x_small(np.minimum(k, 1.0)), x)
+  if np.any(s > SMAX):
+    x = np.where(s > SMAX, x_large(np.maximum(k, 1.0)), x)
+  if polish:
+    x = newton(x, k)
+  return x
+
+def xofp1(p):
+  """Returns x for one pressure p, from the table without numpy
+  """
+  tab = table()
+  s = log(p / a)
+  u = (s - SMIN) / DS
+  if u < 0 or u >= len(tab['ylist']) - 1:
+    return float(xofp(p))
+  i = int(u)
+  t = u - i
+  (y, dy) = (tab['ylist'], tab['dylist'])
+  return exp((1 + 2 * t) * (1 - t)**2 * y[i] + t * (1 - t)**2 * DS * dy[i] +
+             t * t * (3 - 2 * t) * y[i + 1] + t * t * (t - 1) * DS * dy[i + 1])
+
+def accuracy(n=200001):
+  """Returns the largest relative error of x from the table (without and
+  with the Newton polish) on n pressures between and beyond the ends of
+  the table
+  """
+  x = np.exp(np.linspace(-12.0, 12.0, n))
+  p = a * f(x)
+  return [float(np.max(np.abs(xofp(p) / x - 1))), float(np.max(np.abs(xofp(p, True) / x - 1)))]
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : WHITE DWARF (equation of state table)')
+  print('--------------------------------------------------------')
+  print('')
+  p = start_parameter('Pressure (cgs) : ', 1)
+  ps = [p] + [float(v) for v in sys.argv[2:]]
+
+  print('')
+  print('   pressure        x (table)           x (Newton)         rho')
+  for p in ps:
+    xt = float(xofp(p))
+    xn = float(xofp(p, True))
+    print('{: 12.4e} {: 20.14f} {: 20.14f} {: 12.5e}'.format(p, xt, xn, b * xn**3))
+  [err, errp] = accuracy()
+  print('')
+  print('largest relative error of x : {:.2e} (table), {:.2e} (with Newton step)'.format(err, errp))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 11 - Star Formation in the Galaxy : scan of the parameter space
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch11_galactic_star_formation.py integrates the atomic and molecular
+fractions for one set of parameters, 19 steps at a time. Here effes() works
+on arrays, and the whole grid of (m0, a0, n, k1, k2) is integrated together
+with the midpoint steps of the book (dx = .02). Every trajectory is
+classified as soon as possible and then removed from the arrays :
+
+  1  equilibrium : |fa| + |fm| < etol; a, m and s are the equilibrium
+  2  oscillation : the molecular fraction m has a maximum and a minimum per
+                   cycle; after ncycle cycles with amplitudes that agree to
+                   rtol the period (time between the last two maxima) and
+                   the amplitude (half of max - min) are reported
+  3  divergence  : a or m leaves [-amax, amax] or is not finite
+  0  undecided   : none of these before x = xmax
+
+The extremes of m are located at the zeros of fm, interpolated linearly
+inside the step. As in the book, fm = 0 once m <= 0, so an oscillation
+with an amplitude close to .5 whose minimum overshoots zero with these
+steps ends on the equilibrium m <= 0, a = 1 - m (or diverges), which shows
+up as single points inside the region of oscillations. The result is a
+structured array of SCAN with the shape of the grid.
+
+Example:
+$ python ch11_phase_scan.py .15 .1 1 0 20 41 0 5 26
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+
+SCAN = np.dtype([('m0', float), ('a0', float), ('n', float), ('k1', float), ('k2', float),
+                 ('status', np.int8), ('x', float), ('a', float), ('m', float), ('s', float),
+                 ('period', float), ('amplitude', float), ('decay', float), ('steps', np.int32)])
+NAMES = {0: 'undecided', 1: 'equilibrium', 2: 'oscillation', 3: 'divergence'}
+
+def effes(a, m, k1, k2, n):
+  """Computes the right hand sides of the differential equations for
+  arrays of a (atomic fraction) and m (molecular fraction)
+  """
+  fa = 1 - a - m - k1 * m * m * a
+  mp = np.maximum(m, 0)
+  fm = np.where(m > 0, k1 * m * m * a + k2 * (a - 1 + m) * mp**n, 0.0)
+  return [fa, fm]
+
+def scan(m0s, a0s, ns, k1s, k2s, dx=.02, xmax=1000.0, etol=1e-9, rtol=1e-4, ncycle=3, amax=10.0):
+  """Integrates and classifies the trajectories for all combinations of
+  m0s, a0s, ns, k1s and k2s. Returns a structured array of SCAN with shape
+  (len(m0s), len(a0s), len(ns), len(k1s), len(k2s)).
+  """
+  grid = np.meshgrid(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in (m0s, a0s, ns, k1s, k2s)],
+                     indexing='ij')
+  res = np.zeros(grid[0].shape, dtype=SCAN)
+  for (name, v) in zip(['m0', 'a0', 'n', 'k1', 'k2'], grid):
+    res[name] = v
+  res['period'] = np.nan
+  res['amplitude'] = np.nan
+  res['decay'] = np.nan
+  out = res.ravel()
+
+  # state of the trajectories still running
+  idx = np.arange(out.size)
+  [m, a, n, k1, k2] = [out[name].copy() for name in ('m0', 'a0', 'n', 'k1', 'k2')]
+  [fa, fm] = effes(a, m, k1, k2, n)
+  fmold = fm.copy()
+  mold = m.copy()
+  tmax = np.full(idx.shape, np.nan)   # time and value of the last maximum
+  vmax = np.full(idx.shape, np.nan)
+  vmin = np.full(idx.shape, np.nan)   # value of the last minimum
+  amp = np.full(idx.shape, np.nan)    # amplitude of the previous cycle
+  per = np.full(idx.shape, np.nan)
+  dec = np.full(idx.shape, np.nan)
+  same = np.zeros(idx.shape, dtype=int)
+  x = 0.0
+  step = 0
+
+  def finish(done, status):
+    j = idx[done]
+    out['status'][j] = status
+    out['x'][j] = x
+    out['a'][j] = a[done]
+    out['m'][j] = m[done]
+    out['s'][j] = 1 - a[done] - m[done]
+    out['steps'][j] = step
+    if status == 2:
+      out['period'][j] = per[done]
+      out['amplitude'][j] = amp[done]
+      out['decay'][j] = dec[done]
+
+  while idx.size > 0 and x < xmax - .5 * dx:
+    # midpoint step of the book
+    m1 = m + .5 * dx * fm
+    a1 = a + .5 * dx * fa
+    [fa1, fm1] = effes(a1, m1, k1, k2, n)
+    [mold, fmold] = [m, fm]
+    m = m + dx * fm1
+    a = a + dx * fa1
+    step = step + 1
+    x = step * dx
+    [fa, fm] = effes(a, m, k1, k2, n)
+
+    # extremes of m inside the step : fm changes sign
+    with np.errstate(invalid='ignore', divide='ignore'):
+      tau = dx * fmold / (fmold - fm)
+    ext = mold + .5 * fmold * tau
+    top = (fmold > 0) & (fm <= 0) & (m > 0)
+    if np.any(top):
+      t = x - dx + tau[top]
+      cycle = vmax[top] == vmax[top]
+      newamp = .5 * (ext[top] - vmin[top])
+      with np.errstate(invalid='ignore', divide='ignore'):
+        change = newamp / amp[top] - 1
+      agree = np.abs(change) < rtol
+      same[top] = np.where(agree, same[top] + 1, 0)
+      dec[top] = change
+      per[top] = np.where(cycle, t - tmax[top], np.nan)
+      amp[top] = newamp
+      tmax[top] = t
+      vmax[top] = ext[top]
+    low = (fmold < 0) & (fm >= 0) & (m > 0)
+    if np.any(low):
+      vmin[low] = ext[low]
+
+    # classification
+    bad = ~(np.isfinite(a) & np.isfinite(m)) | (np.abs(a) > amax) | (np.abs(m) > amax)
+    equi = ~bad & (np.abs(fa) + np.abs(fm) < etol)
+    osc = ~bad & ~equi & (same >= ncycle - 1)
+    for (done, status) in ((bad, 3), (equi, 1), (osc, 2)):
+      if np.any(done):
+        finish(done, status)
+    keep = ~(bad | equi | osc)
+    if not np.all(keep):
+      idx = idx[keep]
+      [m, a, n, k1, k2, fa, fm] = [v[keep] for v in (m, a, n, k1, k2, fa, fm)]
+      [tmax, vmax, vmin, amp, per, dec, same] = [v[keep] for v in (tmax, vmax, vmin, amp, per, dec, same)]
+
+  # trajectories left undecided
+  if idx.size > 0:
+    finish(np.ones(idx.shape, dtype=bool), 0)
+  return res
+
+def diagram(res):
+  """Returns a text picture of the status (. equilibrium, o oscillation, x
+  divergence, ? undecided) for a 2-d slice of the result, first index down
+  """
+  sym = {0: '?', 1: '.', 2: 'o', 3: 'x'}
+  return '\n'.join(''.join(sym[int(v)] for v in row) for row in res['status'])
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : GALACTIC STAR FORMATION (parameter scan)')
+  print('--------------------------------------------------------')
+  print('')
+  m0   = start_parameter('Initial fraction of molecular clouds : ', 1)
+  a0   = start_parameter('Initial fraction of atomic gas       : ', 2)
+  n    = start_parameter('Parameter n                          : ', 3)
+  k1lo = start_parameter('Parameter k1 from                    : ', 4)
+  k1hi = start_parameter('Parameter k1 to                      : ', 5)
+  nk1  = int(start_parameter('Number of values of k1               : ', 6))
+  k2lo = start_parameter('Parameter k2 from                    : ', 7)
+  k2hi = start_parameter('Parameter k2 to                      : ', 8)
+  nk2  = int(start_parameter('Number of values of k2               : ', 9))
+
+  k1s = np.linspace(k1lo, k1hi, nk1)
+  k2s = np.linspace(k2lo, k2hi, nk2)
+  res = scan(m0, a0, n, k1s, k2s)
+  sl = res[0, 0, 0]
+  print('')
+  print('k1 down from {:g} to {:g}, k2 across from {:g} to {:g}'.format(k1lo, k1hi, k2lo, k2hi))
+  print('(. equilibrium, o oscillation, x divergence, ? undecided)')
+  print('')
+  print(diagram(sl))
+  print('')
+  for status in (1, 2, 3, 0):
+    print('{:12s} : {:d}'.format(NAMES[status], int(np.sum(sl['status'] == status))))
+  osc = sl[sl['status'] == 2]
+  if osc.size > 0:
+    print('')
+    print('    k1       k2      period   amplitude')
+    for r in osc[:20]:
+      print('{: 8.3f} {: 8.3f} {: 10.4f} {: 10.5f}'.format(r['k1'], r['k2'], r['period'], r['amplitude']))
+  if len(sys.argv) > 10:
+    np.save(sys.argv[10], res)
+    print('Scan saved in ' + sys.argv[10])
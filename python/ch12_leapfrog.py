@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 12 - Individual Stellar Orbits in the Galaxy : leapfrog integration
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch12_individual_stellar_orbits.py advances the orbit in the meridional
+plane with midpoint steps of dt = .001. The midpoint method is not
+symplectic : the energy
+
+  E = (u^2 + v^2) / 2 + h^2 / (2 r^2) + V(r, z)
+
+drifts slowly, so long orbits need small steps. Here the orbit can also be
+integrated with the kick-drift-kick leapfrog (method = 'leapfrog'), which
+needs one evaluation of the forces per step instead of two and keeps the
+energy error bounded. For the book's orbit 10 0 0 150 180 the midpoint
+steps of .001 let the energy drift by 28 % in t = 100. The leapfrog ends
+at 8e-5 with dt = .001 and at 1e-3 with dt = .004 (8 times fewer force
+evaluations), with peaks of 1.3e-3 and 2.6e-2 during the pericentre
+passages at r = 5 (samples of every step). The step can thus grow only by
+about 4 times, not by 5 to 10 times : with dt = .005 the pericentre
+passages are no longer resolved, the error peaks at 1e-1 in t = 100 (or
+at 3e-1 : the run is so sensitive that tables differing by 1e-15 give
+either) and reaches 97 % in t = 1000 (against 4e-2 with dt = .004), so
+dt = .004 is the default. The angular momentum h = r0 vt0 enters the equations of
+motion as a constant (vt = h / r), so it is conserved exactly by both
+methods; the energy is the quantity to watch.
+
+The potential V of the galaxy comes from potential() of ch12_force_table.py,
+which uses the same Simpson sums as the forces, so the energy error
+measures the integration only (with kernel = 'table' it also contains the
+interpolation error of the table, about 1e-6 of the forces).
+
+orbit() is a generator that yields one sample (step, t, r, z, u, v, E and
+the relative energy error) every `every` steps, so a run of millions of
+steps needs no memory; run() writes the samples in blocks to a binary file
+of SAMPLE records and keeps track of the largest energy error of the
+samples (so the peak depends on `every`; the energy is not computed at the
+other steps).
+
+Example:
+$ python ch12_leapfrog.py 10 0 0 150 180 .004 4000 leapfrog 200 orbit.bin
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import time
+import numpy as np
+import ch12_force_table
+
+SAMPLE = np.dtype([('step', np.int64), ('t', float), ('r', float), ('z', float), ('u', float), ('v', float),
+                   ('energy', float), ('error', float)])
+
+def force_function(kernel, galaxy):
+  """Returns a function of (r, z) that gives the forces [Kr, Kz] for one
+  point, from the table ('table') or the Simpson sums ('simpson')
+  """
+  if kernel == 'table':
+    return lambda r, z: ch12_force_table.forces1(r, z, **galaxy)
+  e = galaxy.get('e', ch12_force_table.E)
+  fe = galaxy.get('fe', ch12_force_table.FE)
+  a0 = galaxy.get('a0', ch12_force_table.A0)
+  c = ch12_force_table.factor(e, galaxy.get('dc', ch12_force_table.DC))
+  def simpson(r, z):
+    [k1, k2] = ch12_force_table.simpson1(r, z, e, fe, a0)
+    return [c * r * k1, c * z * k2]
+  return simpson
+
+def energy(r, z, u, v, h, **galaxy):
+  """Computes the energy per unit mass in the meridional plane
+  """
+  return .5 * (u * u + v * v) + .5 * h * h / (r * r) + float(ch12_force_table.potential(r, z, **galaxy))
+
+def leapfrog_step(r, z, u, v, kr, kz, h2, dt, force):
+  """Advances r, z, u, v (numbers or arrays) by one kick-drift-kick step dt,
+  with the forces kr, kz at the start of the step, h2 the square of the
+  angular momentum and force a function of (r, z) that returns [Kr, Kz].
+  Returns [r, z, u, v, kr, kz] at the end of the step.
+  """
+  u = u + .5 * dt * (kr + h2 / r**3)
+  v = v + .5 * dt * kz
+  r = r + dt * u
+  z = z + dt * v
+  [kr, kz] = force(r, z)
+  u = u + .5 * dt * (kr + h2 / r**3)
+  v = v + .5 * dt * kz
+  return [r, z, u, v, kr, kz]
+
+def midpoint_step(r, z, u, v, kr, kz, h2, dt, force):
+  """Advances r, z, u, v by one midpoint step dt of the book, as
+  leapfrog_step(). Returns [r, z, u, v, kr, kz] at the end of the step.
+  """
+  # results at half the step
+  r1 = r + .5 * dt * u
+  z1 = z + .5 * dt * v
+  u1 = u + .5 * dt * (kr + h2 / r**3)
+  v1 = v + .5 * dt * kz
+
+  # results at the full step
+  [kr1, kz1] = force(r1, z1)
+  [r, z, u, v] = [r + dt * u1, z + dt * v1, u + dt * (kr1 + h2 / r1**3), v + dt * kz1]
+  [kr, kz] = force(r, z)
+  return [r, z, u, v, kr, kz]
+
+# step functions for each choice of method
+METHODS = {'leapfrog': leapfrog_step, 'midpoint': midpoint_step}
+
+def orbit(r, z, u, v, vt0, dt=.004, nstep=10**6, method='leapfrog', every=100, kernel='table', **galaxy):
+  """Generator that integrates the orbit from r, z, u, v with tangential
+  velocity vt0 for nstep steps dt with the method 'leapfrog' or 'midpoint'
+  (the book's) and yields a tuple (step, t, r, z, u, v, E, dE / |E0|) every
+  `every` steps and after the last one
+  """
+  if method not in METHODS:
+    raise ValueError("method must be 'leapfrog' or 'midpoint'")
+  step = METHODS[method]
+  force = force_function(kernel, galaxy)
+  h = r * vt0
+  h2 = h * h
+  e0 = energy(r, z, u, v, h, **galaxy)
+  yield (0, 0.0, r, z, u, v, e0, 0.0)
+  [kr, kz] = force(r, z)
+
+  for i in range(1, nstep + 1):
+    [r, z, u, v, kr, kz] = step(r, z, u, v, kr, kz, h2, dt, force)
+    if i % every == 0 or i == nstep:
+      en = energy(r, z, u, v, h, **galaxy)
+      yield (i, i * dt, r, z, u, v, en, (en - e0) / abs(e0))
+
+def run(r, z, u, v, vt0, dt=.004, tmax=1000.0, method='leapfrog', every=100, kernel='table', f=None,
+        buffer=4096, **galaxy):
+  """Integrates the orbit up to tmax and writes the samples to the open
+  binary file f (when given), buffer samples at a time. Returns a dict with
+  the number of steps, the last sample, the largest relative energy error
+  and, without a file, all the samples.
+  """
+  nstep = int(round(tmax / dt))
+  block = np.empty(buffer, dtype=SAMPLE)
+  kept = []
+  n = 0
+  maxerr = 0.0
+  for sample in orbit(r, z, u, v, vt0, dt, nstep, method, every, kernel, **galaxy):
+    block[n] = sample
+    maxerr = max(maxerr, abs(sample[7]))
+    n = n + 1
+    if n == buffer:
+      if f is None:
+        kept.append(block.copy())
+      else:
+        block.tofile(f)
+      n = 0
+  last = np.array(sample, dtype=SAMPLE)
+  if f is None:
+    kept.append(block[:n].copy())
+  elif n > 0:
+    block[:n].tofile(f)
+  res = {'nstep': nstep, 'last': last, 'maxerr': maxerr}
+  if f is None:
+    res['samples'] = np.concatenate(kept)
+  return res
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : INDIVIDUAL STELLAR ORBITS (leapfrog)')
+  print('--------------------------------------------------------')
+  print('')
+  r    = start_parameter('Initial conditions :  r(0) : ', 1)
+  z    = start_parameter('Initial conditions :  z(0) : ', 2)
+  u    = start_parameter('Initial conditions :  u(0) : ', 3)
+  v    = start_parameter('Initial conditions :  v(0) : ', 4)
+  vt0  = start_parameter('Initial conditions : vt(0) : ', 5)
+  dt   = start_parameter('Time step                  : ', 6)
+  tmax = start_parameter('Time of integration        : ', 7)
+  method = sys.argv[8] if len(sys.argv) > 8 else 'leapfrog'
+  every = int(sys.argv[9]) if len(sys.argv) > 9 else 100
+
+  t0 = time.time()
+  if len(sys.argv) > 10:
+    with open(sys.argv[10], 'wb') as f:
+      res = run(r, z, u, v, vt0, dt, tmax, method, every, f=f)
+  else:
+    res = run(r, z, u, v, vt0, dt, tmax, method, every)
+  t1 = time.time()
+  last = res['last']
+  print('')
+  print('method : {:s}   steps : {:d}   time per step : {:.1f} us'.format(method, res['nstep'], (t1 - t0) / res['nstep'] * 1e6))
+  print('final state : t = {:.3f}  r = {:.5f}  z = {:.5f}  u = {:.4f}  v = {:.4f}'.format(
+        float(last['t']), float(last['r']), float(last['z']), float(last['u']), float(last['v'])))
+  print('energy : {:.8e}   largest relative error : {:.2e}   final : {: .2e}'.format(
+        float(last['energy']), res['maxerr'], float(last['error'])))
+  if len(sys.argv) > 10:
+    print('Samples written to ' + sys.argv[10])
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 12 - Individual Stellar Orbits in the Galaxy : ensembles of stars
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch12_individual_stellar_orbits.py follows one star at a time. Here a whole
+ensemble of stars, each with its own r0, z0, u0, v0 and vt0 (and angular
+momentum h = r0 vt0), is integrated in lockstep with the midpoint steps of
+the book, all stars in one array. The forces come from the Simpson sums of
+ch12_force_table.py computed for all stars and all nodes at once (kernel =
+'simpson', the default, as for arrays it is three times faster than the
+table), or from its table (kernel = 'table'). trajectory() is the
+integration itself, a generator that yields the state of all stars every
+so many steps for other analyses (see ch12_orbit_frequencies.py).
+
+Every upward crossing of the galactic plane (z from < 0 to >= 0, so v > 0)
+is recorded as soon as it happens : the time of the crossing is found on
+the cubic Hermite interpolant of z(t) in the step (with v = dz/dt at both
+ends), r on the one of r(t), u and v linearly. The crossings of all stars
+form the surface of section (r, u) of the galaxy model. They are collected
+in an array of CROSS records or, when a function sink is given, passed to
+it block by block so that long runs need no memory for them.
+
+Example:
+$ python ch12_orbit_ensemble.py 6 14 9 150 180 20
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+import ch12_force_table
+import ch12_leapfrog
+
+CROSS = np.dtype([('star', np.int32), ('t', float), ('r', float), ('u', float), ('v', float)])
+
+# force functions for each choice of kernel
+KERNELS = {'simpson': ch12_force_table.direct, 'table': ch12_force_table.forces}
+
+def hermite(y0, d0, y1, d1, dt, s):
+  """Evaluates the cubic Hermite interpolant of a step of size dt (values
+  y0, y1 and derivatives d0, d1) at the fraction s of the step. Returns
+  [value, derivative].
+  """
+  s2 = s * s
+  s3 = s2 * s
+  y = (2 * s3 - 3 * s2 + 1) * y0 + (s3 - 2 * s2 + s) * dt * d0 + (-2 * s3 + 3 * s2) * y1 + (s3 - s2) * dt * d1
+  dy = ((6 * s2 - 6 * s) * y0 + (3 * s2 - 4 * s + 1) * dt * d0 + (-6 * s2 + 6 * s) * y1 + (3 * s2 - 2 * s) * dt * d1) / dt
+  return [y, dy]
+
+def crossings(t, dt, star, r, z, u, v, rn, zn, un, vn):
+  """Locates the upward crossings of z = 0 in the step from (r, z, u, v) to
+  (rn, zn, un, vn) for the stars star. Returns an array of CROSS.
+  """
+  s = z / (z - zn)
+  for i in range(3):
+    [p, dp] = hermite(z, v, zn, vn, dt, s)
+    s = np.clip(s - p / (dp * dt), 0, 1)
+  out = np.empty(star.size, dtype=CROSS)
+  out['star'] = star
+  out['t'] = t + s * dt
+  out['r'] = hermite(r, u, rn, un, dt, s)[0]
+  out['u'] = u + s * (un - u)
+  out['v'] = v + s * (vn - v)
+  return out
+
+def trajectory(r0, z0, u0, v0, vt0, tmax, dt=.001, every=1, kernel='simpson', method='midpoint', **galaxy):
+  """Generator that integrates the orbits of the stars with initial
+  conditions r0, z0, u0, v0 and vt0 (arrays or numbers, broadcast together)
+  from t = 0 to tmax with the midpoint steps of the book or the leapfrog of
+  ch12_leapfrog.py (method = 'leapfrog'). galaxy may set e, fe, a0 and dc
+  of the force law. Yields (step, t, r, z, u, v) at t = 0 and every `every`
+  steps, with arrays of all stars.
+  """
+  if method not in ch12_leapfrog.METHODS:
+    raise ValueError("method must be 'midpoint' or 'leapfrog'")
+  step = ch12_leapfrog.METHODS[method]
+  force = lambda r, z: KERNELS[kernel](r, z, **galaxy)
+  [r, z, u, v, vt] = [np.array(x, dtype=float) for x in np.broadcast_arrays(r0, z0, u0, v0, vt0)]
+  [r, z, u, v, vt] = [x.ravel() for x in (r, z, u, v, vt)]
+  h2 = (r * vt)**2
+  nstep = int(round(tmax / dt))
+  yield (0, 0.0, r, z, u, v)
+
+  [kr, kz] = force(r, z)
+  for i in range(1, nstep + 1):
+    [r, z, u, v, kr, kz] = step(r, z, u, v, kr, kz, h2, dt, force)
+    if i % every == 0:
+      yield (i, i * dt, r, z, u, v)
+
+def ensemble(r0, z0, u0, v0, vt0, tmax, dt=.001, kernel='simpson', sink=None, **galaxy):
+  """Integrates the orbits of the stars with initial conditions r0, z0, u0,
+  v0 and vt0 (arrays or numbers, broadcast together) from t = 0 to tmax.
+  galaxy may set e, fe, a0 and dc of the force law. Returns a dict with the
+  final r, z, u, v, t, the number of steps, the number of crossings of
+  every star and the crossings (an array of CROSS, empty when sink is
+  given).
+  """
+  blocks = []
+  for (i, t, rn, zn, un, vn) in trajectory(r0, z0, u0, v0, vt0, tmax, dt, 1, kernel, **galaxy):
+    if i == 0:
+      star = np.arange(rn.size)
+      ncross = np.zeros(rn.size, dtype=np.int64)
+    else:
+      # upward crossings of the plane in the step
+      up = (z < 0) & (zn >= 0)
+      if np.any(up):
+        block = crossings((i - 1) * dt, dt, star[up], r[up], z[up], u[up], v[up], rn[up], zn[up], un[up], vn[up])
+        ncross[up] += 1
+        if sink is None:
+          blocks.append(block)
+        else:
+          sink(block)
+    [r, z, u, v] = [rn, zn, un, vn]
+
+  cross = np.concatenate(blocks) if blocks else np.empty(0, dtype=CROSS)
+  return {'r': r, 'z': z, 'u': u, 'v': v, 't': i * dt, 'nstep': i, 'ncross': ncross, 'cross': cross}
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : INDIVIDUAL STELLAR ORBITS (ensemble)')
+  print('--------------------------------------------------------')
+  print('')
+  rmin = start_parameter('Initial r from        : ', 1)
+  rmax = start_parameter('Initial r to          : ', 2)
+  nr   = int(start_parameter('Number of stars       : ', 3))
+  v0   = start_parameter('Initial v(0)          : ', 4)
+  vt0  = start_parameter('Initial vt(0)         : ', 5)
+  tmax = start_parameter('Time of integration   : ', 6)
+  kernel = sys.argv[8] if len(sys.argv) > 8 else 'simpson'
+
+  res = ensemble(np.linspace(rmin, rmax, nr), 0.0, 0.0, v0, vt0, tmax, kernel=kernel)
+  print('')
+  print('steps : {:d}   crossings : {:d}'.format(res['nstep'], res['cross'].size))
+  print('')
+  print(' star    r(0)   crossings   r(first)   u(first)    r(last)    u(last)')
+  for k in range(nr):
+    c = res['cross'][res['cross']['star'] == k]
+    if c.size > 0:
+      print('{:5d} {: 8.3f} {:8d} {: 11.4f} {: 10.3f} {: 10.4f} {: 10.3f}'.format(
+            k, rmin + (rmax - rmin) * k / max(nr - 1, 1), c.size, c['r'][0], c['u'][0], c['r'][-1], c['u'][-1]))
+    else:
+      print('{:5d} {: 8.3f} {:8d}'.format(k, rmin + (rmax - rmin) * k / max(nr - 1, 1), 0))
+  if len(sys.argv) > 7:
+    np.save(sys.argv[7], res['cross'])
+    print('Crossings saved in ' + sys.argv[7])
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 12 - Individual Stellar Orbits in the Galaxy : orbital frequencies
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Characterizes orbits by their radial and vertical frequencies instead of by
+tables of r and z. The trajectories of a batch of stars come in as a stream
+of blocks (t, r, z, u, v) with the time along the last axis, from the
+integration of ch12_orbit_ensemble.py (ensemble_blocks()) or from a file of
+ch12_leapfrog.py (file_blocks()). windows() cuts the stream into windows of
+nwin samples that overlap by half, keeping only one window in memory, so
+the trajectories can be longer than the memory.
+
+In every window r and z get a Hann window and the frequency of the highest
+peak of their Fourier spectrum (wr and wz, in radians per unit of time) is
+refined by the Gaussian interpolation of the three largest bins, to a small
+fraction of a bin. The actions follow from the mean kinetic energies,
+
+  Jr = <u^2> / wr   and   Jz = <v^2> / wz,
+
+as (1 / 2 pi) times the integral of u dr over one radial period is <u^2> /
+wr for a regular orbit. analyse() keeps for each star the mean, minimum and
+maximum of the frequencies over the windows and classifies the orbit :
+
+  0  regular   : the frequencies of all windows agree to dtol
+  1  resonant  : regular, and wz / wr is within rtol of p / q with q <= qmax
+  2  chaotic   : the frequencies drift by more than dtol between windows
+  3  undecided : fewer than two windows, or no radial oscillation
+
+An orbit in the plane (z = v = 0) has no wz; it is classified on wr alone.
+A window has to resolve the lines of the spectrum : near wz = wr, where the
+lines of r and z lie close together, a short window makes the peaks beat
+with a period 2 pi / |wz - wr| and a regular orbit looks chaotic. The
+defaults (samples .01 apart, windows of 4096) cover about 40 units of time.
+For nearly circular orbits the strongest line of r can be the one at 2 wz
+driven by the vertical motion. The orbits are integrated with the
+leapfrog, as the energy drift of the midpoint steps of the book shows up as
+a drift of the frequencies.
+
+Example:
+$ python ch12_orbit_frequencies.py 6 14 9 150 180 120
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import numpy as np
+import ch12_orbit_ensemble
+
+FREQ = np.dtype([('star', np.int32), ('wr', float), ('wz', float), ('jr', float), ('jz', float),
+                 ('ratio', float), ('p', np.int32), ('q', np.int32), ('drift_r', float), ('drift_z', float),
+                 ('windows', np.int32), ('status', np.int8)])
+NAMES = {0: 'regular', 1: 'resonant', 2: 'chaotic', 3: 'undecided'}
+
+def ensemble_blocks(r0, z0, u0, v0, vt0, tmax, dt=.001, every=10, block=512, kernel='simpson', method='leapfrog',
+                    **galaxy):
+  """Generator that integrates the stars with ch12_orbit_ensemble.trajectory()
+  (leapfrog and the Simpson sums by default) and yields blocks (t, r, z, u,
+  v) of block samples, taken every `every` steps, with arrays r, z, u, v of
+  shape (stars, samples)
+  """
+  n = 0
+  for (i, t, r, z, u, v) in ch12_orbit_ensemble.trajectory(r0, z0, u0, v0, vt0, tmax, dt, every, kernel, method,
+                                                                   **galaxy):
+    if i == 0:
+      tb = np.empty(block)
+      buf = np.empty((4, r.size, block))
+    tb[n] = t
+    for (k, x) in enumerate((r, z, u, v)):
+      buf[k, :, n] = x
+    n = n + 1
+    if n == block:
+      yield (tb.copy(), buf[0].copy(), buf[1].copy(), buf[2].copy(), buf[3].copy())
+      n = 0
+  if n > 0:
+    yield (tb[:n].copy(), buf[0, :, :n].copy(), buf[1, :, :n].copy(), buf[2, :, :n].copy(), buf[3, :, :n].copy())
+
+def file_blocks(f, block=65536):
+  """Generator that reads the SAMPLE records written by ch12_leapfrog.py from
+  the open binary file f, block at a time, and yields blocks (t, r, z, u, v)
+  for one star
+  """
+  import ch12_leapfrog
+  while True:
+    s = np.fromfile(f, dtype=ch12_leapfrog.SAMPLE, count=block)
+    if s.size == 0:
+      break
+    yield (s['t'], s['r'][None], s['z'][None], s['u'][None], s['v'][None])
+
+def windows(blocks, nwin=4096, hop=None):
+  """Generator that cuts the stream of blocks into windows of nwin samples,
+  hop samples apart (nwin / 2 by default), and yields (t, r, z, u, v) of
+  each window. The arrays are overwritten by the next window.
+  """
+  hop = nwin // 2 if hop is None else hop
+  n = 0
+  buf = None
+  for block in blocks:
+    t = block[0]
+    if buf is None:
+      tb = np.empty(nwin)
+      buf = np.empty((4, block[1].shape[0], nwin))
+    j = 0
+    while j < t.size:
+      k = min(nwin - n, t.size - j)
+      tb[n:n + k] = t[j:j + k]
+      for m in range(4):
+        buf[m, :, n:n + k] = block[m + 1][:, j:j + k]
+      n = n + k
+      j = j + k
+      if n == nwin:
+        yield (tb, buf[0], buf[1], buf[2], buf[3])
+        tb[:nwin - hop] = tb[hop:]
+        buf[:, :, :nwin - hop] = buf[:, :, hop:]
+        n = nwin - hop
+
+def peak(x, w, ds):
+  """Returns the angular frequency of the highest peak of the spectrum of
+  the rows of x (Hann window w, samples ds apart), nan for rows without
+  oscillation
+  """
+  nwin = x.shape[-1]
+  y = (x - (x.dot(w) / w.sum())[:, None]) * w
+  a = np.abs(np.fft.rfft(y, axis=-1))
+  # the lowest bins hold what is left of the mean and of slow trends
+  k = np.clip(np.argmax(a[:, 2:-1], axis=-1) + 2, 2, a.shape[-1] - 2)
+  rows = np.arange(x.shape[0])
+  with np.errstate(divide='ignore', invalid='ignore'):
+    [lo, mid, hi] = [np.log(a[rows, k + d]) for d in (-1, 0, 1)]
+    d = .5 * (lo - hi) / (lo - 2 * mid + hi)
+  d = np.where(np.isfinite(d), np.clip(d, -.5, .5), np.nan)
+  return 2 * np.pi * (k + d) / (nwin * ds)
+
+def spectrum(r, z, u, v, ds):
+  """Computes the frequencies and actions of one window of samples ds apart
+  for all stars. Returns [wr, wz, jr, jz].
+  """
+  w = np.hanning(r.shape[-1])
+  wr = peak(r, w, ds)
+  wz = peak(z, w, ds)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    jr = (u * u).dot(w) / w.sum() / wr
+    jz = (v * v).dot(w) / w.sum() / wz
+  return [wr, wz, jr, jz]
+
+def resonance(ratio, rtol=1e-3, qmax=6):
+  """Returns [p, q] of the fraction p / q (smallest q <= qmax) within rtol
+  (relative) of ratio, [0, 0] where there is none
+  """
+  p = np.zeros(ratio.shape, dtype=np.int32)
+  q = np.zeros(ratio.shape, dtype=np.int32)
+  for n in range(1, qmax + 1):
+    with np.errstate(invalid='ignore'):
+      m = np.round(ratio * n)
+      hit = (q == 0) & (m > 0) & (np.abs(ratio * n - m) < rtol * ratio * n)
+    p[hit] = m[hit]
+    q[hit] = n
+  return [p, q]
+
+def analyse(blocks, ds, nwin=4096, hop=None, dtol=1e-3, rtol=1e-3, qmax=6, sink=None):
+  """Streams the blocks (t, r, z, u, v) of samples ds apart through windows of
+  nwin samples and classifies every star. sink, when given, is called with
+  (t, wr, wz, jr, jz) for every window (t at its centre). Returns an array
+  of FREQ.
+  """
+  nw = 0
+  for (t, r, z, u, v) in windows(blocks, nwin, hop):
+    [wr, wz, jr, jz] = spectrum(r, z, u, v, ds)
+    if sink is not None:
+      sink(.5 * (t[0] + t[-1]), wr, wz, jr, jz)
+    if nw == 0:
+      sums = [np.zeros(wr.shape) for x in range(4)]
+      lows = [wr.copy(), wz.copy()]
+      highs = [wr.copy(), wz.copy()]
+    for (s, x) in zip(sums, (wr, wz, jr, jz)):
+      s += x
+    lows = [np.fmin(lo, x) for (lo, x) in zip(lows, (wr, wz))]
+    highs = [np.fmax(hi, x) for (hi, x) in zip(highs, (wr, wz))]
+    nw = nw + 1
+
+  if nw == 0:
+    return np.empty(0, dtype=FREQ)
+  res = np.zeros(sums[0].shape, dtype=FREQ)
+  res['star'] = np.arange(res.size)
+  res['windows'] = nw
+  for (name, s) in zip(('wr', 'wz', 'jr', 'jz'), sums):
+    res[name] = s / nw
+  with np.errstate(divide='ignore', invalid='ignore'):
+    res['drift_r'] = (highs[0] - lows[0]) / res['wr']
+    res['drift_z'] = (highs[1] - lows[1]) / res['wz']
+    res['ratio'] = res['wz'] / res['wr']
+  [res['p'], res['q']] = resonance(res['ratio'], rtol, qmax)
+
+  # an undefined wz (orbit in the plane) does not count as a drift
+  with np.errstate(invalid='ignore'):
+    chaos = (res['drift_r'] > dtol) | (res['drift_z'] > dtol)
+  res['status'] = np.where(chaos, 2, np.where(res['q'] > 0, 1, 0))
+  res['status'][~np.isfinite(res['wr']) | (nw < 2)] = 3
+  return res
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : INDIVIDUAL STELLAR ORBITS (frequencies)')
+  print('--------------------------------------------------------')
+  print('')
+  rmin = start_parameter('Initial r from        : ', 1)
+  rmax = start_parameter('Initial r to          : ', 2)
+  nr   = int(start_parameter('Number of stars       : ', 3))
+  v0   = start_parameter('Initial v(0)          : ', 4)
+  vt0  = start_parameter('Initial vt(0)         : ', 5)
+  tmax = start_parameter('Time of integration   : ', 6)
+  every = int(sys.argv[7]) if len(sys.argv) > 7 else 10
+  nwin = int(sys.argv[8]) if len(sys.argv) > 8 else 4096
+
+  dt = .001
+  blocks = ensemble_blocks(np.linspace(rmin, rmax, nr), 0.0, 0.0, v0, vt0, tmax, dt, every)
+  res = analyse(blocks, every * dt, nwin)
+  print('')
+  print('windows of {:d} samples, {:g} apart : {:d}'.format(nwin, every * dt, int(res['windows'][0]) if res.size else 0))
+  print('')
+  print(' star      wr        wz      wz/wr    p:q       Jr          Jz       drift r   drift z   orbit')
+  for x in res:
+    pq = '{:d}:{:d}'.format(int(x['p']), int(x['q'])) if x['q'] > 0 else '-'
+    print('{:5d} {: 9.4f} {: 9.4f} {: 8.5f} {:>5s} {: 11.4e} {: 11.4e} {: 9.2e} {: 9.2e}   {:s}'.format(
+          int(x['star']), x['wr'], x['wz'], x['ratio'], pq, x['jr'], x['jz'], x['drift_r'], x['drift_z'],
+          NAMES[int(x['status'])]))
+  if len(sys.argv) > 9:
+    np.save(sys.argv[9], res)
+    print('Frequencies saved in ' + sys.argv[9])
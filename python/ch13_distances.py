@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 13 - Cosmological Models for the Universe : distances and lookback time
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch13_universe_model.py gives the scale factor y(x) of the model (s = sigma0,
+q = q0). Light that reaches us with redshift Z left when y = 1 / (1 + Z),
+and the first integral of the Friedmann equation gives the Hubble parameter
+at that time,
+
+  E(Z) = H / H0 = sqrt(2 s (1 + Z)^3 + (s - q) + k (1 + Z)^2),  k = 1 - 3 s + q.
+
+In units of c / H0 and 1 / H0 the comoving distance and the lookback time
+are
+
+  Dc = integral of dZ / E   and   tL = integral of dZ / ((1 + Z) E)
+
+from 0 to Z, and with the curvature k
+
+  Dm = sinh(sqrt(k) Dc) / sqrt(k)    (k > 0, sin for k < 0, Dc for k = 0),
+  Dl = (1 + Z) Dm                    (luminosity distance),
+  Da = Dm / (1 + Z)                  (angular diameter distance).
+
+table() integrates Dc and tL in w = ln(1 + Z) up to ZMAX with the
+Dormand-Prince method of numerics.py (rtol 1e-11) and samples them, and
+Dm, on a grid of step DW in w from its dense output (a finer one when E
+reaches 0 within four steps). The tables are kept in memory for the last
+64 models (s, q). distances() interpolates them with 4-point Lagrange for
+any array of redshifts. A model without a Big Bang (E reaches 0 at some Z)
+has tables only up to that redshift; queries beyond it, beyond ZMAX or
+below 0 give NaN.
+
+Example:
+$ python ch13_distances.py .35 .35 5 10
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import time
+import numpy as np
+from numerics import brentq, dopri5, dopri5_dense, lagrange4, lru_cache
+
+ZMAX = 1e4
+DW = .002
+
+DIST = np.dtype([('z', float), ('dc', float), ('dm', float), ('dl', float), ('da', float), ('tl', float)])
+
+def e2(z, s, q):
+  """Computes E(Z)^2 = (H / H0)^2 at redshift z
+  """
+  zp = 1 + z
+  return 2 * s * zp**3 + (s - q) + (1 - 3 * s + q) * zp * zp
+
+def transverse(dc, k):
+  """Returns the transverse comoving distance Dm for the comoving distance
+  dc and the curvature k
+  """
+  if k > 0:
+    return np.sinh(np.sqrt(k) * dc) / np.sqrt(k)
+  if k < 0:
+    return np.sin(np.sqrt(-k) * dc) / np.sqrt(-k)
+  return dc
+
+@lru_cache(64)
+def table(s, q, zmax=ZMAX, dw=DW):
+  """Integrates Dc and tL of the model (s, q) and samples them with Dm on the
+  grid w = 0, dw, ... (w = ln(1 + Z)) up to zmax or to the redshift where E
+  reaches 0. Returns a dict with the grid step dw, the table (columns Dc,
+  Dm, tL), the last redshift of the table and the number of steps.
+  """
+  w = np.arange(int(np.ceil(np.log1p(zmax) / dw)) + 1) * dw
+
+  # the table ends before E reaches 0 (a model without a Big Bang)
+  zlim = zmax
+  bad = np.nonzero(e2(np.expm1(w), s, q) <= 0)[0]
+  if bad.size > 0:
+    j = bad[0]
+    zlim = brentq(lambda z: e2(z, s, q), np.expm1(w[j - 1]), np.expm1(w[j]))
+    # too few nodes for 4-point Lagrange : a finer grid below zlim
+    if j < 4:
+      dw = np.log1p(zlim) / 4
+      j = 4
+    w = np.arange(j) * dw
+
+  def rhs(x, y):
+    zp = np.exp(x)
+    ee = np.sqrt(e2(zp - 1, s, q))
+    return np.array([zp / ee, 1 / ee])
+  res = dopri5(rhs, 0.0, [0.0, 0.0], w[-1], rtol=1e-11, atol=1e-13)
+
+  # dense output of every step at the nodes of the grid inside it
+  data = np.empty((w.size, 3))
+  ts = res['t']
+  step = np.clip(np.searchsorted(ts, w, side='right') - 1, 0, len(res['k']) - 1)
+  for i in np.unique(step):
+    on = step == i
+    y = dopri5_dense(ts[i], res['y'][i], ts[i + 1] - ts[i], res['k'][i], w[on])
+    data[on, 0] = y[0]
+    data[on, 2] = y[1]
+  data[:, 1] = transverse(data[:, 0], 1 - 3 * s + q)
+  return {'dw': dw, 'data': data, 'zlim': min(zlim, np.expm1(w[-1])), 'nstep': res['nstep']}
+
+def distances(z, s, q):
+  """Computes the comoving, transverse comoving, luminosity and angular
+  diameter distances (in c / H0) and the lookback time (in 1 / H0) for the
+  redshifts z (any array) of the model (s, q). Returns a dict of arrays
+  with keys dc, dm, dl, da and tl.
+  """
+  t = table(float(s), float(q))
+  z = np.asarray(z, dtype=float)
+  zp = 1 + z
+  # negative redshifts lie outside the table (w < 0) and give NaN
+  w = np.where(z >= 0, np.log(np.where(z >= 0, zp, 1)), -1.0)
+  v = lagrange4(w, 0.0, t['dw'], t['data'])
+  return {'dc': v[..., 0], 'dm': v[..., 1], 'dl': zp * v[..., 1], 'da': v[..., 1] / zp, 'tl': v[..., 2]}
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : UNIVERSE MODEL (distances)')
+  print('--------------------------------------------------------')
+  print('')
+  s    = start_parameter('sigma(0)             : ', 1)
+  q    = start_parameter('q(0)                 : ', 2)
+  zmax = start_parameter('Redshift up to       : ', 3)
+  nz   = int(start_parameter('Number of redshifts  : ', 4))
+
+  t0 = time.time()
+  t = table(s, q)
+  t1 = time.time()
+  print('')
+  print('table of {:d} points from {:d} steps in {:.1f} ms, up to Z = {:g}'.format(
+        t['data'].shape[0], t['nstep'], (t1 - t0) * 1e3, t['zlim']))
+
+  zs = np.linspace(0, zmax, nz + 1)
+  d = distances(zs, s, q)
+  print('')
+  print('     Z          Dc          Dm          Dl          Da          tL')
+  for i in range(zs.size):
+    print('{: 8.3f} {: 11.6f} {: 11.6f} {: 11.6f} {: 11.6f} {: 11.6f}'.format(
+          zs[i], d['dc'][i], d['dm'][i], d['dl'][i], d['da'][i], d['tl'][i]))
+
+  zr = np.random.uniform(0, zmax, 10**6)
+  t0 = time.time()
+  distances(zr, s, q)
+  t1 = time.time()
+  print('')
+  print('10^6 redshifts in {:.0f} ms'.format((t1 - t0) * 1e3))
+  if len(sys.argv) > 5:
+    out = np.empty(zs.size, dtype=DIST)
+    out['z'] = zs
+    for name in ('dc', 'dm', 'dl', 'da', 'tl'):
+      out[name] = d[name]
+    np.save(sys.argv[5], out)
+    print('Distances saved in ' + sys.argv[5])
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+
+"""
+Chapter 13 - Cosmological Models for the Universe : atlas of models
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+ch13_universe_model.py integrates the Friedmann equation
+
+  y'' = -s / y^2 + (s - q) y,   y(0) = 1, y'(0) = z(0) = 1
+
+(y the scale factor, x = H0 t, s = sigma0, q = q0) for one model, into the
+past and into the future. Here a whole grid of (s, q) is integrated at once
+with the same midpoint steps (dx = .02, .01 once |z| > 2), every model in
+one array (with a smaller dx the steps become dx and dx / 2). A model
+leaves the arrays as soon as its fate is known :
+
+  past    1  Big Bang       : y comes down to yclose; the rest of the way to
+                              y = 0 follows from the first integral
+                              z^2 = 2 s / y + (s - q) y^2 + k, k = 1 - 3 s + q,
+                              with Gauss-Legendre in u = sqrt(y / yclose),
+                              which is exact where the steps are not
+          0  no Big Bang    : z drops to 0, the model went through a minimum
+          2  undecided      : still going at |x| = xmax
+  future  1  recollapse     : z changes sign (the maximum ymax at time tmax
+                              from the parabola through the step), then y
+                              comes down to yclose and the time of the
+                              collapse follows as for the Big Bang
+          0  expands forever: z > 0 and the first integral can no longer
+                              reach 0 for larger y (s - q >= 0 and z^2 > 0
+                              at its minimum ahead, or z^2 >= 0 with s > 0,
+                              where z only tends to 0 as for k = 0)
+          2  undecided      : still going at x = xmax (s - q < 0 close to
+                              0 recollapses only after a long time)
+
+The closure is only used where the first integral stays positive down to
+y = 0; otherwise the steps go on (a minimum just below yclose).
+
+The age of a model with a Big Bang is the time back to y = 0 in units of
+1 / H0. The result is a structured array of ATLAS (in single precision, to
+keep an atlas of millions of models small) with the shape of the grid.
+
+Example:
+$ python ch13_universe_atlas.py 0 2 21 -2 2 41 atlas.npy
+"""
+
+from __future__ import print_function, division
+from helpers import start_parameter
+import sys
+import time
+import numpy as np
+from numerics import lru_cache
+
+ATLAS = np.dtype([('s', np.float32), ('q', np.float32), ('bang', np.int8), ('age', np.float32),
+                  ('fate', np.int8), ('tmax', np.float32), ('ymax', np.float32), ('tend', np.float32)])
+PAST = {0: 'no Big Bang', 1: 'Big Bang', 2: 'undecided'}
+FUTURE = {0: 'expands forever', 1: 'recollapse', 2: 'undecided'}
+
+@lru_cache(8)
+def gauss(n):
+  """Returns the nodes and weights of n point Gauss-Legendre on [0, 1]
+  """
+  (u, w) = np.polynomial.legendre.leggauss(n)
+  return (.5 * (u + 1), .5 * w)
+
+def tail(y, s, q, n=16):
+  """Computes the time from scale factor 0 to y (arrays) from the first
+  integral of the Friedmann equation, with n point Gauss-Legendre in
+  u = sqrt(y' / y)
+  """
+  (u, w) = gauss(n)
+  y = y[..., None]
+  k = 1 - 3 * s[..., None] + q[..., None]
+  f = 2 * s[..., None] + (s - q)[..., None] * y**3 * u**6 + k * y * u * u
+  return (2 * y**1.5 * u * u / np.sqrt(f)).dot(w)
+
+def clear(y, s, lam, k):
+  """Returns True where the first integral z^2 = 2 s / y + lam y^2 + k
+  stays positive between 0 and y, so that tail() holds
+  """
+  g = lambda t: 2 * s + lam * t**3 + k * t
+  with np.errstate(divide='ignore', invalid='ignore'):
+    yc = np.sqrt(-k / (3 * lam))
+  inside = (lam > 0) & (k < 0) & (yc < y)
+  return (g(y) > 0) & ((s > 0) | (k > 0)) & ~(inside & (g(np.where(inside, yc, 0)) <= 0))
+
+def era(s, q, dx, xmax, yclose):
+  """Integrates the models s, q (1-d arrays) from x = 0 in steps dx (< 0 for
+  the past, > 0 for the future) and removes every model from the arrays as
+  soon as its fate is known. Returns [status, t0, t1, y1] with t0 the time
+  of the Big Bang or of the collapse and t1, y1 the time and scale factor
+  of the maximum (future only).
+  """
+  status = np.full(s.shape, 2, dtype=np.int8)
+  t0 = np.full(s.shape, np.nan)
+  t1 = np.full(s.shape, np.nan)
+  y1 = np.full(s.shape, np.nan)
+  idx = np.arange(s.size)
+  lam = s - q
+  k = 1 - 3 * s + q
+  x = np.zeros(s.shape)
+  y = np.ones(s.shape)
+  z = np.ones(s.shape)
+  h = np.full(s.shape, float(dx))
+  up = np.zeros(s.shape, dtype=bool)     # past the maximum
+  future = dx > 0
+  if future:
+    # scale factor beyond which z can only grow (lam > 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      ystar = np.where(lam > 0, np.cbrt(s / lam), np.inf)
+
+  while idx.size > 0:
+    # halve the time step if function y is too steep
+    h = np.where(np.abs(z) > 2, .5 * dx, h)
+
+    # midpoint step of the book
+    y12 = y + .5 * h * z
+    z12 = z + .5 * h * (-s / (y * y) + lam * y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      yn = y + h * z12
+      zn = z + h * (-s / (y12 * y12) + lam * y12)
+    xn = x + h
+
+    # a step that jumps over y = 0 ends where it started
+    jump = (y12 <= 0) | (yn <= 0)
+    [xn, yn, zn] = [np.where(jump, x, xn), np.where(jump, y, yn), np.where(jump, z, zn)]
+
+    if future:
+      # maximum of y inside the step : z changes sign
+      top = ~up & (zn <= 0)
+      if np.any(top):
+        a = (z[top] - zn[top]) / h[top]
+        t1[idx[top]] = x[top] + z[top] / a
+        y1[idx[top]] = y[top] + .5 * z[top] * z[top] / a
+        up = up | top
+      # z > 0 and the first integral no longer reaches 0 ahead
+      ya = np.maximum(yn, ystar)
+      with np.errstate(divide='ignore', invalid='ignore'):
+        fmin = np.where(lam > 0, 2 * s / ya + lam * ya * ya + k, k)
+      # fmin = 0 with s > 0 (k = 0, as Einstein-de Sitter) : z only tends to 0
+      forever = ~up & (zn > 0) & (lam >= 0) & ((fmin > 0) | ((fmin >= 0) & (s > 0)))
+      status[idx[forever]] = 0
+      y1[idx[forever]] = np.inf
+      going = up
+      done = forever
+    else:
+      bounce = zn <= 0
+      status[idx[bounce]] = 0
+      going = ~bounce
+      done = bounce
+
+    # Big Bang or collapse : the rest of the way to y = 0 from the first integral
+    close = going & ((yn < yclose) | jump)
+    end = close.copy()
+    if np.any(close):
+      end[close] = clear(yn[close], s[close], lam[close], k[close])
+      status[idx[end]] = 1
+      t0[idx[end]] = np.abs(xn[end]) + tail(yn[end], s[end], q[end])
+
+    # models that jumped over y = 0 without a tail stay undecided
+    done = done | end | (close & jump) | (np.abs(xn) >= xmax)
+    [x, y, z] = [xn, yn, zn]
+    if np.any(done):
+      keep = ~done
+      idx = idx[keep]
+      [s, q, lam, k, x, y, z, h, up] = [v[keep] for v in (s, q, lam, k, x, y, z, h, up)]
+      if future:
+        ystar = ystar[keep]
+  return [status, t0, t1, y1]
+
+def atlas(ss, qs, dx=.02, xmax=100.0, yclose=.1):
+  """Integrates the models for all combinations of ss (sigma0) and qs (q0)
+  into the past and into the future. Returns a structured array of ATLAS
+  with shape (len(ss), len(qs)).
+  """
+  grid = np.meshgrid(np.atleast_1d(np.asarray(ss, dtype=float)), np.atleast_1d(np.asarray(qs, dtype=float)),
+                     indexing='ij')
+  res = np.zeros(grid[0].shape, dtype=ATLAS)
+  res['s'] = grid[0]
+  res['q'] = grid[1]
+  [s, q] = [v.ravel() for v in grid]
+  out = res.ravel()
+
+  [status, age, t1, y1] = era(s, q, -dx, xmax, yclose)
+  out['bang'] = status
+  out['age'] = age
+  [status, tend, t1, y1] = era(s, q, dx, xmax, yclose)
+  out['fate'] = status
+  out['tmax'] = t1
+  out['ymax'] = y1
+  out['tend'] = tend
+  return res
+
+def diagram(res):
+  """Returns a text picture of the atlas, s down and q across : B Big Bang
+  and expanding forever, C Big Bang and recollapse, o no Big Bang,
+  ? undecided
+  """
+  def sym(b, f):
+    if b == 0:
+      return 'o'
+    if b == 2 or f == 2:
+      return '?'
+    return 'C' if f == 1 else 'B'
+  return '\n'.join(''.join(sym(b, f) for (b, f) in zip(row['bang'], row['fate'])) for row in res)
+
+if __name__ == '__main__':
+  print('Astrophysics with a PC : UNIVERSE MODEL (atlas)')
+  print('--------------------------------------------------------')
+  print('')
+  smin = start_parameter('sigma(0) from        : ', 1)
+  smax = start_parameter('sigma(0) to          : ', 2)
+  ns   = int(start_parameter('Number of sigma(0)   : ', 3))
+  qmin = start_parameter('q(0) from            : ', 4)
+  qmax = start_parameter('q(0) to              : ', 5)
+  nq   = int(start_parameter('Number of q(0)       : ', 6))
+
+  t0 = time.time()
+  res = atlas(np.linspace(smin, smax, ns), np.linspace(qmin, qmax, nq))
+  t1 = time.time()
+  print('')
+  print('{:d} models in {:.2f} s'.format(res.size, t1 - t0))
+  if nq <= 100 and ns <= 100:
+    print('')
+    print('sigma(0) down from {:g} to {:g}, q(0) across from {:g} to {:g}'.format(smin, smax, qmin, qmax))
+    print('(B Big Bang and expanding forever, C Big Bang and recollapse, o no Big Bang, ? undecided)')
+    print('')
+    print(diagram(res))
+  print('')
+  for b in (1, 0, 2):
+    print('{:16s} : {:d}'.format(PAST[b], int(np.sum(res['bang'] == b))))
+  for f in (0, 1, 2):
+    print('{:16s} : {:d}'.format(FUTURE[f], int(np.sum(res['fate'] == f))))
+  if len(sys.argv) > 7:
+    np.save(sys.argv[7], res)
+    print('Atlas saved in ' + sys.argv[7])
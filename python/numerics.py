@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""
+Numerical methods shared by the batch tools
+
+'Astrophysics with a PC' by Paul Hellings, ISBN 943396-43-3
+Copyright (c) 1994 Paul Hellings. All rights reserved.
+
+Chapter 1 of the book introduces the numerical methods used by the programs
+(the Cauchy/midpoint method, predictor-corrector and Simpson's rule). The
+batch tools need a few more : an embedded Runge-Kutta method with error
+control and event location, a bracketing root finder, interpolation in
+tables, a place on disk to keep those tables between runs and a small
+least-recently-used cache in memory in front of them.
+"""
+
+from __future__ import print_function, division
+from collections import OrderedDict
+import os
+import numpy as np
+
+# Dormand-Prince 5(4) coefficients
+DP_C = np.array([0, 1 / 5.0, 3 / 10.0, 4 / 5.0, 8 / 9.0, 1, 1])
+DP_A = [[],
+        [1 / 5.0],
+        [3 / 40.0, 9 / 40.0],
+        [44 / 45.0, -56 / 15.0, 32 / 9.0],
+        [19372 / 6561.0, -25360 / 2187.0, 64448 / 6561.0, -212 / 729.0],
+        [9017 / 3168.0, -355 / 33.0, 46732 / 5247.0, 49 / 176.0, -5103 / 18656.0],
+        [35 / 384.0, 0, 500 / 1113.0, 125 / 192.0, -2187 / 6784.0, 11 / 84.0]]
+DP_B = np.array([35 / 384.0, 0, 500 / 1113.0, 125 / 192.0, -2187 / 6784.0, 11 / 84.0, 0])
+DP_E = np.array([71 / 57600.0, 0, -71 / 16695.0, 71 / 1920.0, -17253 / 339200.0, 22 / 525.0, -1 / 40.0])
+
+# coefficients of the 4th order continuous extension (dense output)
+DP_P = np.array([
+  [1, -8048581381 / 2820520608.0, 8663915743 / 2820520608.0, -12715105075 / 11282082432.0],
+  [0, 0, 0, 0],
+  [0, 131558114200 / 32700410799.0, -68118460800 / 10900136933.0, 87487479700 / 32700410799.0],
+  [0, -1754552775 / 470086768.0, 14199869525 / 1410260304.0, -10690763975 / 1880347072.0],
+  [0, 127303824393 / 49829197408.0, -318862633887 / 49829197408.0, 701980252875 / 199316789632.0],
+  [0, -282668133 / 205662961.0, 2019193451 / 616988883.0, -1453857185 / 822651844.0],
+  [0, 40617522 / 29380423.0, -110615467 / 29380423.0, 69997945 / 29380423.0]])
+
+def brentq(f, a, b, xtol=1e-14, rtol=4e-16, maxiter=100):
+  """Finds a root of f between a and b with Brent's method. f(a) and f(b)
+  must have opposite signs (or one of them must be zero).
+  """
+  fa = f(a)
+  fb = f(b)
+  if fa == 0:
+    return a
+  if fb == 0:
+    return b
+  if fa * fb > 0:
+    raise ValueError('root is not bracketed by [{0}, {1}]'.format(a, b))
+  c, fc = a, fa
+  d = e = b - a
+  for i in range(maxiter):
+    if fb * fc > 0:
+      c, fc = a, fa
+      d = e = b - a
+    if abs(fc) < abs(fb):
+      a, b, c = b, c, b
+      fa, fb, fc = fb, fc, fb
+    tol = 2 * rtol * abs(b) + .5 * xtol
+    m = .5 * (c - b)
+    if abs(m) <= tol or fb == 0:
+      return b
+    if abs(e) >= tol and abs(fa) > abs(fb):
+      # try inverse quadratic interpolation (or secant if only two points)
+      s = fb / fa
+      if a == c:
+        p = 2 * m * s
+        q = 1 - s
+      else:
+        q = fa / fc
+        r = fb / fc
+        p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+        q = (q - 1) * (r - 1) * (s - 1)
+      if p > 0:
+        q = -q
+      else:
+        p = -p
+      if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+        e = d
+        d = p / q
+      else:
+        d = m
+        e = m
+    else:
+      d = m
+      e = m
+    a, fa = b, fb
+    b = b + (d if abs(d) > tol else (tol if m > 0 else -tol))
+    fb = f(b)
+  return b
+
+def dopri5_dense(t, y, h, k, x):
+  """Evaluates the continuous extension of a Dormand-Prince step from
+  (t, y) with size h and stages k at the times x (scalar or array)
+  """
+  theta = (np.asarray(x, dtype=float) - t) / h
+  powers = np.array([theta, theta**2, theta**3, theta**4])
+  q = np.dot(k.T, DP_P)
+  return (y[:, None] + h * np.dot(q, powers.reshape(4, -1))).reshape(y.shape + np.shape(theta))
+
+def dopri5(fun, t0, y0, t1, rtol=1e-6, atol=1e-9, h0=None, hmax=np.inf, events=(), maxstep=100000):
+  """Integrates dy/dt = fun(t, y) from t0 to t1 with the Dormand-Prince 5(4)
+  method and step size control. events is a sequence of functions g(t, y);
+  the integration stops at the first sign change of any of them, which is
+  located by root finding on the dense output. Returns a dict with the
+  accepted steps (t, y), the stages of each step (k, for dense output),
+  the event index, time and state (or None) and the counts of accepted
+  steps, rejected steps and right hand side evaluations.
+  """
+  y = np.array(y0, dtype=float)
+  atol = np.broadcast_to(np.asarray(atol, dtype=float), y.shape)
+  direction = 1.0 if t1 >= t0 else -1.0
+  t = t0
+  nfev = 1
+  f = np.asarray(fun(t, y), dtype=float)
+  if h0 is None:
+    # starting step of Hairer, Norsett and Wanner : a first guess from y and
+    # f, corrected with an estimate of the second derivative (one Euler step)
+    scale = atol + rtol * np.abs(y)
+    d0 = np.sqrt(np.mean((y / scale)**2))
+    d1 = np.sqrt(np.mean((f / scale)**2))
+    h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else .01 * d0 / d1
+    h0 = min(h0, abs(t1 - t0))
+    f1 = np.asarray(fun(t + direction * h0, y + direction * h0 * f), dtype=float)
+    nfev = nfev + 1
+    d2 = np.sqrt(np.mean(((f1 - f) / scale)**2)) / h0
+    dmax = max(d1, d2)
+    h1 = max(1e-6, h0 * 1e-3) if dmax <= 1e-15 else (.01 / dmax)**.2
+    h0 = min(100 * h0, h1)
+  h = min(abs(h0), abs(t1 - t0), hmax)
+  g = [ev(t, y) for ev in events]
+
+  ts = [t]
+  ys = [y]
+  ks = []
+  nstep = 0
+  nrej = 0
+  rejected = False
+  hold = None
+  errold = 1.0
+  result = {'event': None, 'te': None, 'ye': None}
+  k = np.empty((7, y.size))
+  while direction * (t1 - t) > 0 and nstep < maxstep:
+    h = min(h, abs(t1 - t))
+    hs = direction * h
+
+    # stages of the step, the last one is the derivative at the new state
+    k[0] = f
+    for s in range(1, 7):
+      k[s] = fun(t + DP_C[s] * hs, y + hs * np.dot(DP_A[s], k[:s]))
+    nfev = nfev + 6
+    ynew = y + hs * np.dot(DP_B, k)
+    scale = atol + rtol * np.maximum(np.abs(y), np.abs(ynew))
+    err = np.sqrt(np.mean((hs * np.dot(DP_E, k) / scale)**2))
+
+    # reject the step on a too large error (or a state outside the domain
+    # of the right hand sides) and try again with a smaller step
+    if not np.isfinite(err) or err > 1:
+      nrej = nrej + 1
+      rejected = True
+      h = h * (.2 if not np.isfinite(err) else max(.2, .9 * err**-.2))
+      continue
+
+    tnew = t + hs
+    knew = k.copy()
+    nstep = nstep + 1
+
+    # check for a sign change of the event functions and locate the root
+    gnew = [ev(tnew, ynew) for ev in events]
+    hit = [i for i in range(len(events)) if g[i] * gnew[i] <= 0 and gnew[i] != g[i]]
+    if hit:
+      roots = []
+      for i in hit:
+        gi = lambda tt, i=i: events[i](tt, dopri5_dense(t, y, hs, knew, tt))
+        roots.append(brentq(gi, t, tnew))
+      j = int(np.argmin(direction * (np.array(roots) - t)))
+      te = roots[j]
+      ye = dopri5_dense(t, y, hs, knew, te)
+      result.update({'event': hit[j], 'te': te, 'ye': ye})
+      ts.append(te)
+      ys.append(ye)
+      ks.append(knew)
+      break
+
+    ts.append(tnew)
+    ys.append(ynew)
+    ks.append(knew)
+    t = tnew
+    y = ynew
+    f = knew[6]
+    g = gnew
+    # predictive controller of Gustafsson : when the error grows from step to
+    # step (a right hand side that steepens), the next step anticipates it;
+    # no growth right after a rejected step, which would only be rejected again
+    fac = 5.0 if err == 0 else .9 * err**-.2
+    if err > 0 and hold is not None:
+      fac = min(fac, fac * (h / hold) * (errold / err)**.2)
+    fac = min(1 if rejected else 5, max(.2, fac))
+    rejected = False
+    (hold, errold) = (h, max(err, 1e-10))
+    h = min(hmax, h * fac)
+
+  result.update({'t': np.array(ts), 'y': np.array(ys), 'k': ks, 'nstep': nstep, 'nrej': nrej, 'nfev': nfev})
+  return result
+
+def cache_path(name):
+  """Returns the path of a file in the cache directory for precomputed
+  tables ($ASTROPC_CACHE, or ~/.cache/astrophysics_with_a_pc), creating
+  the directory when needed
+  """
+  folder = os.environ.get('ASTROPC_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'astrophysics_with_a_pc'))
+  if not os.path.isdir(folder):
+    try:
+      os.makedirs(folder)
+    except OSError:
+      if not os.path.isdir(folder):
+        raise
+  return os.path.join(folder, name)
+
+def cached_table(name, build):
+  """Loads the arrays stored under name (an .npz file in the cache
+  directory) or, when the file does not exist yet, calls build() to compute
+  them as a dict of arrays and stores the result. Returns the dict.
+  """
+  path = cache_path(name)
+  if os.path.exists(path):
+    with np.load(path) as data:
+      return dict((key, data[key]) for key in data.files)
+  table = build()
+
+  # write to a temporary file first so that a concurrent reader never sees
+  # a half written table
+  tmp = '{0}.{1}.tmp.npz'.format(path[:-4] if path.endswith('.npz') else path, os.getpid())
+  np.savez(tmp, **table)
+  os.rename(tmp, path)
+  return table
+
+def lagrange4(x, x0, dx, table):
+  """Interpolates table (sampled at x0, x0 + dx, ... along its first axis)
+  at the points x with 4-point (cubic) Lagrange interpolation. Points
+  outside the table give NaN. The result has shape x.shape + table.shape[1:].
+  """
+  x = np.asarray(x, dtype=float)
+  n = table.shape[0]
+  s = (x - x0) / dx
+  i = np.clip(np.floor(s).astype(int) - 1, 0, n - 4)
+  t = s - i
+  w = [-(t - 1) * (t - 2) * (t - 3) / 6.0, t * (t - 2) * (t - 3) / 2.0,
+       -t * (t - 1) * (t - 3) / 2.0, t * (t - 1) * (t - 2) / 6.0]
+  tail = (Ellipsis,) + (None,) * (table.ndim - 1)
+  out = sum(w[k][tail] * table[i + k] for k in range(4))
+  bad = (s < 0) | (s > n - 1) | np.isnan(s)
+  if np.any(bad):
+    out = np.where(bad[tail], np.nan, out)
+  return out
+
+def lagrange4_2d(x, y, x0, dx, y0, dy, table):
+  """Interpolates table (sampled at x0 + i dx, y0 + j dy along its first two
+  axes) at the points (x, y) with 4 x 4 point (bicubic) Lagrange
+  interpolation. Points outside the table give NaN. The result has shape
+  x.shape + table.shape[2:].
+  """
+  x = np.asarray(x, dtype=float)
+  y = np.asarray(y, dtype=float)
+  (nx, ny) = table.shape[:2]
+  flat = table.reshape((nx * ny,) + table.shape[2:])
+  tail = (Ellipsis,) + (None,) * (table.ndim - 2)
+  stencil = []
+  for (v, v0, dv, n) in ((x, x0, dx, nx), (y, y0, dy, ny)):
+    s = (v - v0) / dv
+    i = np.clip(np.floor(s).astype(int) - 1, 0, n - 4)
+    t = s - i
+    w = [-(t - 1) * (t - 2) * (t - 3) / 6.0, t * (t - 2) * (t - 3) / 2.0,
+         -t * (t - 1) * (t - 3) / 2.0, t * (t - 1) * (t - 2) / 6.0]
+    stencil.append((i, w, (s < 0) | (s > n - 1) | np.isnan(s)))
+  [(i, wx, badx), (j, wy, bady)] = stencil
+  base = i * ny + j
+  out = 0.0
+  for k in range(4):
+    row = sum(wy[l][tail] * np.take(flat, base + (k * ny + l), axis=0) for l in range(4))
+    out = out + wx[k][tail] * row
+  bad = badx | bady
+  if np.any(bad):
+    out = np.where(bad[tail], np.nan, out)
+  return out
+
+def lru_cache(maxsize=1024):
+  """Decorator that keeps the results of the last maxsize calls of a
+  function with hashable arguments in memory
+  """
+  def decorate(func):
+    cache = OrderedDict()
+    def wrapper(*args):
+      if args in cache:
+        value = cache.pop(args)
+      else:
+        value = func(*args)
+        if len(cache) >= maxsize:
+          cache.popitem(last=False)
+      cache[args] = value
+      return value
+    wrapper.cache = cache
+    wrapper.__doc__ = func.__doc__
+    wrapper.__name__ = func.__name__
+    return wrapper
+  return decorate